@@ -1,34 +1,77 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 
-# Load datasets
-df_original = pd.read_csv("player_injuries_impact.csv")
-df_cleaned = pd.read_csv("cleaned_player_injuries_impact.csv")
-df_nuked = pd.read_csv("cleaned_nuked_player_injuries_impact.csv")
+import cleaning
+import pipeline
+import schema
+
+# ---------------------------------------------------------
+# Data loss comparison of the cleaning strategies in cleaning.py
+# ---------------------------------------------------------
+# The raw file is read and validated once; every strategy is applied
+# to that frame in memory (in worker processes with --workers) and
+# compared on rows kept, match cells kept per phase and the resulting
+# Team_Performance_Drop_Index distribution.
+
+
+def evaluate(name, df):
+    cleaned = pipeline.clean(df, strategy=name)
+    detailed = pipeline.add_metrics(cleaned)
+
+    cells = cleaned[[c for c in cleaned.columns if schema.MATCH_COL.match(c)]].notna().sum()
+    phases = cells.index.str.extract(schema.MATCH_COL)[1].to_numpy()
+    cells = cells.groupby(phases).sum().reindex(schema.PHASES).rename(name)
+
+    drop = detailed["Team_Performance_Drop_Index"].astype(float).describe().rename(name)
+    return len(cleaned), cells, drop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the data loss of the cleaning strategies.")
+    parser.add_argument("--input", default=pipeline.RAW_CSV, help="raw injury CSV")
+    parser.add_argument("--strategies", default=",".join(cleaning.STRATEGIES),
+                        help="comma-separated strategies (default: all of %(default)s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, one strategy each (default: 1)")
+    args = parser.parse_args(argv)
 
-# Row counts
-orig_rows = len(df_original)
-cleaned_rows = len(df_cleaned)
-nuked_rows = len(df_nuked)
+    names = args.strategies.split(",")
+    unknown = [name for name in names if name not in cleaning.STRATEGIES]
+    if unknown:
+        parser.error(f"unknown strategies {', '.join(unknown)}; choose from {', '.join(cleaning.STRATEGIES)}")
 
-# Data loss calculations
-cleaned_loss = orig_rows - cleaned_rows
-cleaned_loss_pct = (cleaned_loss / orig_rows) * 100
+    # Load dataset once
+    df = pipeline.read_raw(args.input)
+    df.insert(0, "injury_id", pipeline.injury_ids(df))
+    orig_rows = len(df)
+    df, quarantined = pipeline.validate(df)
 
-nuked_loss = orig_rows - nuked_rows
-nuked_loss_pct = (nuked_loss / orig_rows) * 100
+    if args.workers == 1:
+        results = [evaluate(name, df) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(evaluate, name, df) for name in names]
+            results = [future.result() for future in futures]
 
-# Print results
-print("===== DATA LOSS COMPARISON =====")
-print(f"Original dataset rows: {orig_rows}\n")
+    rows = pd.DataFrame({"rows_kept": [kept for kept, _, _ in results]}, index=pd.Index(names, name="strategy"))
+    rows["rows_removed"] = orig_rows - rows["rows_kept"]
+    rows["data_loss_%"] = (rows["rows_removed"] / orig_rows * 100).round(2)
+    cells = pd.concat([cells for _, cells, _ in results], axis=1).T.rename_axis("strategy")
+    drop = pd.concat([drop for _, _, drop in results], axis=1).T.rename_axis("strategy")
 
-print("---- Cleaned Dataset (Critical Method) ----")
-print(f"Rows kept: {cleaned_rows}")
-print(f"Rows removed: {cleaned_loss}")
-print(f"Data loss: {cleaned_loss_pct:.2f}%\n")
+    # Print results
+    print("===== DATA LOSS COMPARISON =====")
+    print(f"Original dataset rows: {orig_rows} ({len(quarantined)} failed validation)\n")
+    print("---- Rows ----")
+    print(rows.to_string(), "\n")
+    print("---- Match cells kept per phase ----")
+    print(cells.to_string(), "\n")
+    print("---- Team_Performance_Drop_Index ----")
+    print(drop.round(3).to_string(), "\n")
+    print("============================================")
 
-print("---- Cleaned Nuked Dataset (Match1+Match2 Method) ----")
-print(f"Rows kept: {nuked_rows}")
-print(f"Rows removed: {nuked_loss}")
-print(f"Data loss: {nuked_loss_pct:.2f}%\n")
 
-print("============================================")
+if __name__ == "__main__":
+    main()
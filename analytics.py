@@ -0,0 +1,199 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import pipeline
+import schema
+import storage
+
+# ---------------------------------------------------------
+# Analytics cube: every EDA / dashboard aggregate from one scan
+# ---------------------------------------------------------
+# The detailed table is reduced once to sums, sums of squares and
+# counts per (Name, Team, Position, Age, Injury, Season). That base
+# cube has about one row per injury, and every per-player, club,
+# position, age group, injury type and season table is rolled up from
+# it, with means and stds taken from the sums. Injury counts by month
+# live in the pipeline's count cube (see injury_counts.py).
+#
+# The cube is saved to CUBE_FILE together with a fingerprint of the
+# input tables and rebuilt only when they change, so EDA.py and the app
+# read the aggregates instead of recomputing them.
+CUBE_FILE = "analytics_cube.pkl"
+# Part of the fingerprint; bump it when the cube's tables change shape
+CUBE_VERSION = 5
+
+DETAILED_COLS = ["Name", "Team Name", "Position", "Age", "Season", "Injury",
+                 "Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury",
+                 "Team_Performance_Drop_Index"]
+# Written by the pipeline's opposition stage and date parsing; NaN for
+# tables built before them (Days_Out is then taken from the dates)
+OPTIONAL_COLS = ["Adj_Team_Performance_Drop_Index", "Days_Out"]
+DIMENSIONS = ["Name", "Team Name", "Position", "Age", "Injury", "Season", "Recovery"]
+MEASURES = ["Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury",
+            "Team_Performance_Drop_Index", "Adj_Team_Performance_Drop_Index", "Player_Rating_Delta",
+            "Days_Out", "Age"]
+
+AGE_BINS = [16, 23, 28, 32, 45]
+AGE_LABELS = ["Young (17-23)", "Prime (24-28)", "Veteran (29-32)", "Late Career (33+)"]
+
+# Days out, [low, high)
+RECOVERY_BINS = [0, 7, 28, 90, np.inf]
+RECOVERY_LABELS = ["Under a week", "1-4 weeks", "1-3 months", "3+ months"]
+
+
+def fingerprint(metrics=pipeline.METRICS, summary=pipeline.SUMMARY):
+    parts = [f"v{CUBE_VERSION}"]
+    for stem in (metrics, summary):
+        path = storage.find_table(stem)
+        if path is None:
+            raise FileNotFoundError(f"No table found for '{stem}', run pipeline.py first")
+        stat = os.stat(path)
+        parts.append(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+@instrument.profiled("analytics.load_inputs")
+def load_inputs(metrics=pipeline.METRICS, summary=pipeline.SUMMARY):
+    available = storage.table_columns(storage.find_table(metrics))
+    columns = DETAILED_COLS + [c for c in OPTIONAL_COLS if c in available]
+    if "Days_Out" not in available:
+        columns += schema.DATE_COLS
+    df_detailed = storage.load_table(metrics, columns=columns)
+    if "Days_Out" not in available:
+        df_detailed["Days_Out"] = (df_detailed["Date of return"] - df_detailed["Date of Injury"]).dt.days
+    df_detailed = df_detailed.reindex(columns=DETAILED_COLS + OPTIONAL_COLS)
+    df_summary = storage.load_table(summary)
+
+    df_detailed["Player_Rating_Delta"] = (df_detailed["Player_Avg_Rating_After_Injury"].astype(float)
+                                          - df_detailed["Player_Avg_Rating_Before_Injury"].astype(float))
+    for col in MEASURES:
+        df_detailed[col] = pd.to_numeric(df_detailed[col], errors="coerce")
+    df_detailed["Recovery"] = pd.cut(df_detailed["Days_Out"], bins=RECOVERY_BINS, labels=RECOVERY_LABELS, right=False)
+    for col in ["Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury", "Team_Performance_Drop"]:
+        if col in df_summary.columns:
+            df_summary[col] = pd.to_numeric(df_summary[col], errors="coerce")
+
+    # Plain strings for grouping; missing positions stay NaN
+    position = df_detailed["Position"].astype(object)
+    df_detailed["Position"] = position.where(position.notna(), np.nan).astype(str).replace({"nan": np.nan})
+    return df_detailed, df_summary
+
+
+def base_cube(df):
+    """Sums, sums of squares and non-null counts of MEASURES per DIMENSIONS.
+
+    Groups keep the order of their first row, so "first" values rolled
+    up from the cube are the same as on the rows.
+    """
+    values = df[MEASURES].astype(float)
+    data = pd.concat({"sum": values, "sumsq": values ** 2, "count": values.notna().astype(int)}, axis=1)
+    data[("rows", "")] = 1
+    groups = data.groupby([df[d] for d in DIMENSIONS], sort=False, dropna=False, observed=True)
+    return groups.sum(min_count=0)
+
+
+def rollup(base, by):
+    """Means, stds and counts of MEASURES grouped by cube levels or arrays."""
+    keys = [base.index.get_level_values(k) if isinstance(k, str) else k for k in by]
+    sums = base.groupby(keys, observed=True).sum()
+    n = sums["count"]
+    mean = sums["sum"] / n.where(n > 0)
+    var = (sums["sumsq"] - sums["sum"] ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+    out = pd.concat({"mean": mean, "std": np.sqrt(var.clip(lower=0)), "count": n}, axis=1)
+    out = out.swaplevel(axis=1).sort_index(axis=1)
+    out[("rows", "")] = sums[("rows", "")]
+    return out
+
+
+def select(table, **columns):
+    """Named columns from a rolled-up table, e.g. select(cube["clubs"], Avg_Age=("Age", "mean"))."""
+    return pd.DataFrame({name: table[col] for name, col in columns.items()})
+
+
+@instrument.profiled("analytics.build_cube")
+def build_cube(df_detailed, df_summary):
+    base = base_cube(df_detailed)
+    index = base.index.to_frame(index=False)
+    age_group = pd.cut(index["Age"], bins=AGE_BINS, labels=AGE_LABELS).rename("Age_Group")
+
+    players = rollup(base, ["Name"])
+    first = index.groupby("Name")[["Age", "Position", "Team Name"]].first()
+    players = players.join(pd.concat({"first": first}, axis=1).swaplevel(axis=1))
+
+    # Summary-based tables: per-player rating change with position/team
+    meta = df_detailed[["Name", "Position", "Team Name"]].drop_duplicates(subset=["Name"], keep="first")
+    if "Position" not in df_summary.columns or "Team Name" not in df_summary.columns:
+        df_summary = df_summary.merge(meta, on="Name", how="left")
+    if "Player_Rating_Delta" not in df_summary.columns:
+        df_summary["Player_Rating_Delta"] = (df_summary["Player_Avg_Rating_After_Injury"]
+                                             - df_summary["Player_Avg_Rating_Before_Injury"])
+    performance_change = df_summary.dropna(
+        subset=["Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury"], how="any"
+    )[["Name", "Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury",
+       "Player_Rating_Delta", "Position", "Team Name"]].copy()
+    performance_change["Performance_Change_%"] = (
+        performance_change["Player_Rating_Delta"] / performance_change["Player_Avg_Rating_Before_Injury"] * 100
+    ).round(2)
+
+    # float64 for the statistics (Age is stored as Int8)
+    numeric = df_detailed[["Age", "Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury",
+                           "Team_Performance_Drop_Index"]].astype(float)
+    return {
+        "base": base,
+        "players": players,
+        "clubs": rollup(base, ["Team Name"]),
+        "positions": rollup(base, ["Position"]),
+        "age_groups": rollup(base, [age_group.array]).rename_axis("Age_Group"),
+        "injuries": rollup(base, ["Injury"]),
+        "seasons": rollup(base, ["Season"]),
+        "recovery": rollup(base, ["Recovery"]),
+        "player_ages": index[["Name", "Age"]].drop_duplicates(),
+        "describe": numeric.describe(),
+        "corr": numeric.corr(),
+        "top_impact": df_detailed.nlargest(5, "Team_Performance_Drop_Index"),
+        "age_drop": df_detailed[["Age", "Team_Performance_Drop_Index"]],
+        "performance_change": performance_change,
+        "totals": pd.Series({
+            "injuries": len(df_detailed),
+            "players": df_detailed["Name"].nunique(),
+            "clubs": df_detailed["Team Name"].nunique(),
+            "avg_drop": df_detailed["Team_Performance_Drop_Index"].mean(),
+        }),
+    }
+
+
+def load_cube(metrics=pipeline.METRICS, summary=pipeline.SUMMARY, path=CUBE_FILE, rebuild=False):
+    key = fingerprint(metrics, summary)
+    if not rebuild and os.path.exists(path):
+        cached = pd.read_pickle(path)
+        if cached.get("fingerprint") == key:
+            return cached["tables"]
+
+    tables = build_cube(*load_inputs(metrics, summary))
+
+    # Written next to the target and renamed, so a reader never sees half a file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle({"fingerprint": key, "tables": tables}, tmp)
+    os.replace(tmp, path)
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the analytics cube used by EDA.py and the dashboard.")
+    parser.add_argument("--metrics", default=pipeline.METRICS, help="per-injury metrics table")
+    parser.add_argument("--summary", default=pipeline.SUMMARY, help="per-player phase summary table")
+    parser.add_argument("--output", default=CUBE_FILE)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if the inputs did not change")
+    args = parser.parse_args(argv)
+
+    tables = load_cube(args.metrics, args.summary, args.output, args.rebuild)
+    print(f"Analytics cube '{args.output}': {len(tables['base'])} cells, "
+          f"{len(tables['players'])} players, {len(tables['clubs'])} clubs.")
+
+
+if __name__ == "__main__":
+    main()
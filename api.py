@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from urllib.request import urlopen
+
+import analytics
+import injury_counts
+import instrument
+import pipeline
+import significance
+import storage
+import views
+
+# ---------------------------------------------------------
+# Read-only HTTP/JSON service over the pipeline outputs
+# ---------------------------------------------------------
+# The tables are loaded once per process and shared by every request
+# (one thread per request). Responses are serialized once and kept in
+# an LRU cache of CACHE_SIZE bodies. Before each request the mtimes and
+# sizes of the input files are compared with the loaded ones; after a
+# pipeline refresh the tables are reloaded and the cache is emptied.
+#
+# streamlit_app.py uses the service instead of reading the files when
+# the URL_ENV environment variable points at it, e.g.
+#   $ python api.py --port 8000
+#   $ INJURY_API_URL=http://127.0.0.1:8000 streamlit run streamlit_app.py
+# and load_test.py measures its throughput and latency.
+HOST = "127.0.0.1"
+PORT = 8000
+CACHE_SIZE = 512
+URL_ENV = "INJURY_API_URL"
+TIMEOUT = 30
+DETAILED_COLS = ["injury_id", "Name", "Team Name", "Position", "Season", "Injury", "Date of Injury"]
+MATCH_COLS = ["injury_id", "phase", "match_index", "rating"]
+PLAYER_PARAMS = {"team": "Team Name", "position": "Position", "season": "Season"}
+HEATMAP_PARAMS = {"injury": "Injury", "season": "Season", "position": "Position"}
+MEASURES = ["Team_Performance_Drop_Index", "Adj_Team_Performance_Drop_Index"]
+
+
+def records(df):
+    """JSON-ready list of row dicts, with None for missing values."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+class ResponseCache:
+    """Least recently used serialized responses, safe to share between threads."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            body = self.items.get(key)
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.items.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self.lock:
+            self.items[key] = body
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class Tables:
+    """One load of the pipeline tables and aggregates; never changed afterwards."""
+
+    @instrument.profiled("api.load")
+    def __init__(self):
+        if storage.find_table(pipeline.MATCHES):
+            detailed = storage.load_table(pipeline.METRICS, columns=DETAILED_COLS)
+            long = storage.load_table(pipeline.MATCHES, columns=MATCH_COLS)
+        else:
+            detailed = storage.load_table(pipeline.METRICS)
+            long = pipeline.to_long(detailed)
+            detailed = detailed.assign(injury_id=pipeline.ids_of(detailed))[DETAILED_COLS]
+        self.summary = storage.load_table(pipeline.SUMMARY)
+        self.players = self.summary.set_index("Name")
+        self.meta = views.player_filters(detailed)
+        self.ratings = views.match_rating_rows(detailed, long)
+        self.ratings_by_player = self.ratings.groupby("Name").indices
+        self.counts = (injury_counts.load(pipeline.COUNTS) if os.path.exists(pipeline.COUNTS)
+                       else injury_counts.build(detailed))
+        self.cube = analytics.load_cube()
+        self.stats = None
+        self.stats_lock = threading.Lock()
+
+    def group_stats(self):
+        # Loaded on the first request that needs it (cached on disk too)
+        with self.stats_lock:
+            if self.stats is None:
+                self.stats = significance.load_stats()
+            return self.stats
+
+
+class Store:
+    """The current Tables, replaced when the input files change."""
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache = ResponseCache(cache_size)
+        self.lock = threading.Lock()
+        self.signature = None
+        self.tables = None
+
+    def inputs(self):
+        paths = [storage.find_table(stem) for stem in (pipeline.METRICS, pipeline.SUMMARY, pipeline.MATCHES)]
+        return [path for path in paths + [pipeline.COUNTS] if path and os.path.exists(path)]
+
+    def current_signature(self):
+        return tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in self.inputs())
+
+    def refresh(self):
+        """(signature, Tables) for the input files as they are now."""
+        signature = self.current_signature()
+        with self.lock:
+            # Requests already running keep the Tables they started with
+            if signature != self.signature:
+                self.tables = Tables()
+                self.cache.clear()
+                self.signature = signature
+            return self.signature, self.tables
+
+
+# ---------------------------------------------------------
+# Endpoints: (tables, query parameters) -> JSON-ready data
+# ---------------------------------------------------------
+def first(params, name, default=None):
+    return params.get(name, [default])[0]
+
+
+def chosen(params, names):
+    return {column: params.get(name, []) for name, column in names.items()}
+
+
+def options(tables, params):
+    return {
+        "adjusted_available": views.has_adjusted(tables.cube),
+        "players": {column: sorted(tables.meta[column].unique()) for column in views.FILTER_COLS},
+        "heatmap": {column: [str(label) for label in tables.counts[column]] for column in HEATMAP_PARAMS.values()},
+    }
+
+
+def top_injuries(tables, params):
+    measure = first(params, "measure", MEASURES[0])
+    if measure not in MEASURES:
+        raise ValueError(f"measure must be one of {', '.join(MEASURES)}")
+    stats = tables.group_stats() if first(params, "significant", "0") == "1" else None
+    limit = int(first(params, "limit", views.TOP_N))
+    return records(views.top_injury_drops(tables.cube, measure, stats, limit))
+
+
+def players(tables, params):
+    names = views.filtered_names(tables.meta, chosen(params, PLAYER_PARAMS), tables.players.index)
+    return list(names)
+
+
+def player_timeline(tables, params):
+    name = first(params, "name")
+    if name not in tables.players.index:
+        raise KeyError(f"Unknown player '{name}'")
+    ratings = tables.players.loc[[name], ["Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury"]]
+    return {
+        **records(ratings.reset_index())[0],
+        "matches": records(tables.ratings.iloc[tables.ratings_by_player.get(name, [])]),
+    }
+
+
+def heatmap(tables, params):
+    pivot, undated = views.month_club_heatmap(tables.counts, chosen(params, HEATMAP_PARAMS))
+    return {
+        "teams": [str(team) for team in pivot.index],
+        "months": [int(month) for month in pivot.columns],
+        "counts": pivot.to_numpy().tolist(),
+        "undated": undated,
+    }
+
+
+def age_vs_delta(tables, params):
+    df = views.age_vs_delta(tables.summary, tables.cube["player_ages"])
+    return records(df[["Name", "Age", "Player_Rating_Delta", "Size_Positive"]])
+
+
+def leaderboard(tables, params):
+    limit = first(params, "limit")
+    board = views.comeback_leaderboard(tables.summary)
+    return records(board.head(int(limit)) if limit else board)
+
+
+def recovery(tables, params):
+    return records(views.recovery_duration(tables.cube).astype({"Recovery": str}))
+
+
+def health(tables, params):
+    return {"status": "ok", "players": len(tables.players)}
+
+
+ENDPOINTS = {
+    "/health": health,
+    "/options": options,
+    "/top-injuries": top_injuries,
+    "/players": players,
+    "/player-timeline": player_timeline,
+    "/heatmap": heatmap,
+    "/age-vs-delta": age_vs_delta,
+    "/leaderboard": leaderboard,
+    "/recovery": recovery,
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    store = None
+    quiet = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        endpoint = ENDPOINTS.get(url.path.rstrip("/") or "/health")
+        if endpoint is None:
+            return self.reply(404, {"error": f"Unknown endpoint {url.path}", "endpoints": list(ENDPOINTS)})
+
+        # Uncacheable (health) and error responses are built every time
+        signature, tables = self.store.refresh()
+        params = parse_qs(url.query)
+        key = (signature, url.path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        body = self.store.cache.get(key) if endpoint is not health else None
+        if body is not None:
+            return self.reply(200, body=body, cache="hit")
+        try:
+            body = json.dumps(endpoint(tables, params), default=str).encode()
+        except KeyError as e:
+            return self.reply(404, {"error": e.args[0]})
+        except ValueError as e:
+            return self.reply(400, {"error": str(e)})
+        if endpoint is not health:
+            self.store.cache.put(key, body)
+        return self.reply(200, body=body, cache="miss")
+
+    def reply(self, status, data=None, body=None, cache=None):
+        body = json.dumps(data).encode() if body is None else body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if cache:
+            self.send_header("X-Cache", cache)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes clients beyond it wait a second for
+    # a TCP retry when many connect at once
+    request_queue_size = 128
+
+
+def make_server(host=HOST, port=PORT, cache_size=CACHE_SIZE, quiet=True):
+    store = Store(cache_size)
+    store.refresh()
+    handler = type("StoreHandler", (Handler,), {"store": store, "quiet": quiet})
+    return Server((host, port), handler)
+
+
+def fetch(base_url, endpoint, timeout=TIMEOUT, **params):
+    """Parsed JSON of `endpoint` (e.g. "top-injuries") with list-valued params repeated."""
+    query = urlencode({name: value for name, value in params.items() if value is not None}, doseq=True)
+    with urlopen(f"{base_url.rstrip('/')}/{endpoint}" + (f"?{query}" if query else ""), timeout=timeout) as response:
+        return json.load(response)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard aggregates as JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="responses kept in memory")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.cache_size, quiet=not args.verbose)
+    print(f"Serving {', '.join(ENDPOINTS)} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
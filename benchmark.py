@@ -0,0 +1,184 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import injury_db
+import pipeline
+import significance
+import similarity
+import synthetic_data
+
+# ---------------------------------------------------------
+# Benchmark: time and memory of every stage on synthetic data
+# ---------------------------------------------------------
+# In-process stages are measured with time.perf_counter and the
+# tracemalloc peak. EDA.py and the dashboard run in a child process in
+# a directory holding the generated tables; their memory is the child's
+# peak RSS. The bootstrap/permutation statistics are timed on their own
+# (significance) and cached before EDA.py runs, so "eda" is the
+# statistics with --no-plots and "figures" is a second EDA.py run that
+# redraws the figures from the cached aggregates.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ["preprocessing", "feature_engineering", "grouping", "storage", "significance", "eda", "figures",
+          "dashboard"]
+
+# Runs in the child; prints the peak RSS (KB on Linux) as the last line
+CHILD_EDA = """
+import resource, runpy, sys
+sys.path.insert(0, {repo!r})
+sys.argv = ["EDA.py", *{args!r}]
+runpy.run_path({script!r}, run_name="__main__")
+# Figures are drawn in worker processes, so their peak counts as well
+print(max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)))
+"""
+
+CHILD_DASHBOARD = """
+import resource, sys
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, {repo!r})
+app = AppTest.from_file({script!r}, default_timeout=600).run()
+for section in app.radio[0].options:
+    app.radio[0].set_value(section).run()
+    if app.exception:
+        raise SystemExit(str(app.exception))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {"seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2)}
+
+
+def measure_child(code, cwd):
+    env = dict(os.environ, MPLBACKEND="Agg")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"child process failed:\n{proc.stderr[-2000:]}")
+    peak_kb = int(proc.stdout.strip().splitlines()[-1])
+    return {"seconds": round(seconds, 4), "peak_mb": round(peak_kb / 1024, 2)}
+
+
+def bench_size(rows, workdir, stages, seed=0):
+    raw_path = os.path.join(workdir, "player_injuries_impact.csv")
+    synthetic_data.generate(rows, os.path.join(REPO_DIR, pipeline.RAW_CSV), seed).to_csv(raw_path, index=False)
+    results = {}
+
+    def preprocessing():
+        df = pipeline.read_raw(raw_path)
+        df.insert(0, "injury_id", pipeline.injury_ids(df))
+        return pipeline.clean(df)
+
+    cleaned, results["preprocessing"] = measure(preprocessing)
+    results["preprocessing"]["rows_out"] = len(cleaned)
+
+    def feature_engineering():
+        long = pipeline.to_long(cleaned)
+        return long, pipeline.add_metrics(cleaned, long)
+
+    (long, detailed), results["feature_engineering"] = measure(feature_engineering)
+    results["feature_engineering"]["rows_out"] = len(detailed)
+
+    summary, results["grouping"] = measure(pipeline.phase_summary, detailed, long)
+    results["grouping"]["rows_out"] = len(summary)
+
+    # Same writes as pipeline.run: tables, count cube, SQLite store and similarity index
+    paths = [os.path.join(workdir, name) for name in (pipeline.METRICS, pipeline.SUMMARY, pipeline.MATCHES,
+                                                      pipeline.COUNTS, injury_db.DB_FILE, similarity.INDEX_FILE)]
+    _, results["storage"] = measure(pipeline.write_outputs, detailed, summary, long, *paths)
+
+    # EDA.py reuses the cached statistics, so they are built first
+    # whenever it runs, and only reported when asked for
+    if {"significance", "eda", "figures"} & set(stages):
+        stats_paths = [os.path.join(workdir, name) for name in (pipeline.METRICS, pipeline.SUMMARY,
+                                                                significance.STATS_FILE)]
+        _, results["significance"] = measure(significance.load_stats, *stats_paths)
+    eda = os.path.join(REPO_DIR, "EDA.py")
+    if "eda" in stages:
+        results["eda"] = measure_child(CHILD_EDA.format(repo=REPO_DIR, script=eda, args=["--no-plots"]), workdir)
+    if "figures" in stages:
+        results["figures"] = measure_child(CHILD_EDA.format(repo=REPO_DIR, script=eda, args=["--force"]), workdir)
+    if "dashboard" in stages:
+        results["dashboard"] = measure_child(
+            CHILD_DASHBOARD.format(repo=REPO_DIR, script=os.path.join(REPO_DIR, "streamlit_app.py")), workdir)
+
+    return {stage: results[stage] for stage in STAGES if stage in results and stage in stages}
+
+
+def compare(report, baseline, threshold):
+    old = {(r["scale"], stage): m for r in baseline["results"] for stage, m in r["stages"].items()}
+    regressions = []
+    print(f"\n{'scale':>7} {'stage':<20} {'seconds':>9} {'baseline':>9} {'ratio':>7}")
+    for r in report["results"]:
+        for stage, m in r["stages"].items():
+            if (r["scale"], stage) not in old:
+                continue
+            base = old[(r["scale"], stage)]["seconds"]
+            ratio = m["seconds"] / base if base else np.nan
+            flag = "  <-- slower" if ratio > threshold else ""
+            print(f"{r['scale']:>7g} {stage:<20} {m['seconds']:>9.3f} {base:>9.3f} {ratio:>7.2f}{flag}")
+            if flag:
+                regressions.append((r["scale"], stage))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline, EDA and dashboard on synthetic data.")
+    parser.add_argument("--scales", default="10,100,1000",
+                        help="comma-separated sizes as multiples of the shipped dataset")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"subset of {','.join(STAGES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression with --compare")
+    args = parser.parse_args(argv)
+
+    base_rows = len(pd.read_csv(os.path.join(REPO_DIR, pipeline.RAW_CSV), usecols=["Name"]))
+    stages = args.stages.split(",")
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "versions": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__},
+        "results": [],
+    }
+
+    for scale in [float(s) for s in args.scales.split(",")]:
+        rows = int(round(scale * base_rows))
+        with tempfile.TemporaryDirectory() as workdir:
+            stage_results = bench_size(rows, workdir, stages, args.seed)
+        report["results"].append({"scale": scale, "rows": rows, "stages": stage_results})
+        for stage, m in stage_results.items():
+            print(f"{scale:>7g}x {rows:>9} rows  {stage:<20} {m['seconds']:>9.3f}s {m['peak_mb']:>9.1f} MB")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved '{args.output}'")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+import schema
+
+# ---------------------------------------------------------
+# Cleaning strategies: which injuries are kept, and how gaps are filled
+# ---------------------------------------------------------
+# Each strategy takes the raw rows with missing markers as NaN and
+# ratings/GDs already numeric, and returns the rows to keep (filled in
+# or not). pipeline.clean applies one of them (DEFAULT unless told
+# otherwise) and Data_loss_comparision.py compares all of them. A new
+# strategy is a function added to STRATEGIES.
+DEFAULT = "match1_match2"
+
+
+def slot_columns(df):
+    """{(phase, match number): {raw field: column}}, i.e. schema.match_slots keyed by field."""
+    return {slot: {schema.raw_field(col): col for col in cols} for slot, cols in schema.match_slots(df).items()}
+
+
+def phase_columns(df, field):
+    """{phase: [columns of `field` in that phase]}, e.g. every before-injury GD."""
+    cols = {}
+    for (phase, _), fields in sorted(slot_columns(df).items()):
+        if field in fields:
+            cols.setdefault(phase, []).append(fields[field])
+    return cols
+
+
+def keep_all(df):
+    return df
+
+
+def drop_without_match1_match2(df):
+    # The pipeline's rule: drop rows only if ALL Match1 AND ALL Match2 values are missing
+    cols = [col for col in df.columns if col.startswith(("Match1_", "Match2_"))]
+    return df.dropna(subset=cols, how="all")
+
+
+def drop_missing_critical(df):
+    # Keep injuries with data for every headline metric: a GD before the
+    # injury and while out, and a player rating before and after
+    needed = [("GD", "before_injury"), ("GD", "missed_match"),
+              ("Player_rating", "before_injury"), ("Player_rating", "after_injury")]
+    keep = pd.Series(True, index=df.index)
+    for field, phase in needed:
+        keep &= df[phase_columns(df, field).get(phase, [])].notna().any(axis=1)
+    return df[keep]
+
+
+def impute_phase_medians(df):
+    # Rows kept as in the pipeline; a missing GD or rating of a played
+    # match (result or opposition known), and the first match of a phase
+    # without any, get the median of that field and phase over all rows
+    df = drop_without_match1_match2(df).copy()
+    slots = slot_columns(df)
+    for field in ("GD", "Player_rating"):
+        for phase, cols in phase_columns(df, field).items():
+            median = np.nanmedian(df[cols].to_numpy(dtype=float))
+            empty = df[cols].isna().all(axis=1)
+            for (slot_phase, _), fields in slots.items():
+                if slot_phase != phase or field not in fields:
+                    continue
+                played = df[[fields[f] for f in ("Result", "Opposition") if f in fields]].notna().any(axis=1)
+                df.loc[played & df[fields[field]].isna(), fields[field]] = median
+            df.loc[empty, cols[0]] = median
+    return df
+
+
+STRATEGIES = {
+    "keep_all": keep_all,
+    "match1_match2": drop_without_match1_match2,
+    "critical": drop_missing_critical,
+    "impute": impute_phase_medians,
+}
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+# ---------------------------------------------------------
+# EDA.py figures, rendered off-screen (Agg) in worker processes
+# ---------------------------------------------------------
+# Each figure is drawn from a small dict of Series/DataFrames taken from
+# the analytics cube. A hash of that data, the DPI and the format is
+# kept in FIGURE_MANIFEST, and a figure whose file exists with the same
+# hash is not drawn again.
+FORMATS = ["png", "svg", "webp"]
+FIGURE_MANIFEST = "eda_figures.json"
+
+
+def draw_dashboard(data, path, dpi):
+    fig, axes = plt.subplots(2,3, figsize=(18,12))
+    fig.suptitle("SportHurt Injury Analysis Dashboard", fontsize=14, fontweight="bold")
+
+    # Top 10 injured players
+    ax = axes[0,0]
+    data["top_players"].plot(kind="barh", ax=ax, color="coral")
+    ax.set_title("Top 10 Most Frequently Injured Players")
+    ax.set_xlabel("Injury Count")
+
+    # Club injury counts
+    ax = axes[0,1]
+    data["club_counts"].plot(kind="bar", ax=ax, color="skyblue")
+    ax.set_title("Top 10 Injury-Prone Clubs")
+    ax.set_ylabel("Total Injuries")
+    ax.tick_params(axis="x", rotation=45)
+
+    # Avg perf drop by position
+    ax = axes[0,2]
+    data["pos_perf"].plot(kind="bar", ax=ax, color="lightgreen")
+    ax.set_title("Avg Performance Drop by Position")
+    ax.set_ylabel("Avg Performance Drop")
+    ax.tick_params(axis="x", rotation=45)
+
+    # Age vs performance drop scatter
+    ax = axes[1,0]
+    age_drop = data["age_drop"]
+    ax.scatter(age_drop["Age"], age_drop["Team_Performance_Drop_Index"], alpha=0.6, s=60, color="purple")
+    ax.set_xlabel("Age")
+    ax.set_ylabel("Team Performance Drop Index")
+    ax.set_title("Age vs Performance Impact")
+
+    # Top injury types
+    ax = axes[1,1]
+    top_inj = data["top_inj"]
+    ax.barh(top_inj.index, top_inj.values, color="salmon")
+    ax.set_title("Top 8 Injury Types")
+    ax.set_xlabel("Count")
+
+    # Season trend
+    ax = axes[1,2]
+    season_counts = data["season_counts"]
+    ax.plot(season_counts.index, season_counts.values, marker="o", color="darkblue")
+    ax.set_title("Injuries by Season")
+    ax.set_xlabel("Season")
+    ax.set_ylabel("Total Injuries")
+    ax.tick_params(axis="x", rotation=45)
+
+    plt.tight_layout()
+    plt.subplots_adjust(top=0.92)
+    plt.savefig(path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+
+
+def draw_comparison(data, path, dpi):
+    # Before vs After recovery comparison (top 20 by absolute change)
+    top20 = data["top20"]
+    fig2, ax = plt.subplots(figsize=(12,7))
+    indices = np.arange(len(top20))
+    w = 0.35
+    ax.bar(indices - w/2, top20["Player_Avg_Rating_Before_Injury"], width=w, label="Before", color="steelblue")
+    ax.bar(indices + w/2, top20["Player_Avg_Rating_After_Injury"], width=w, label="After", color="coral")
+    ax.set_xticks(indices)
+    ax.set_xticklabels(top20["Name"], rotation=45, ha="right")
+    ax.set_ylabel("Avg Rating")
+    ax.set_title("Before vs After Injury (sample players)")
+    ax.legend()
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig2)
+
+
+FIGURES = {
+    "injury_analysis_dashboard": draw_dashboard,
+    "before_after_recovery_comparison": draw_comparison,
+}
+
+
+def data_hash(data, dpi, fmt):
+    h = hashlib.sha1(f"{dpi}|{fmt}".encode())
+    for key in sorted(data):
+        value = data[key]
+        h.update(key.encode())
+        h.update(repr(list(getattr(value, "columns", []))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def render_one(name, data, path, dpi):
+    sns.set_style("whitegrid")
+    plt.rcParams["figure.figsize"] = (15,12)
+    FIGURES[name](data, path, dpi)
+    return path
+
+
+def render(jobs, fmt="png", dpi=300, workers=None, force=False, manifest_path=FIGURE_MANIFEST):
+    """Draw the figures in `jobs` ({name: data}) and return {name: (path, status)}.
+
+    status is "saved", or "unchanged" when the file is up to date.
+    """
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    todo, results = {}, {}
+    for name, data in jobs.items():
+        path = f"{name}.{fmt}"
+        key = data_hash(data, dpi, fmt)
+        if not force and manifest.get(name, {}).get(path) == key and os.path.exists(path):
+            results[name] = (path, "unchanged")
+        else:
+            todo[name] = (data, path, key)
+
+    if workers == 1 or len(todo) <= 1:
+        for name, (data, path, _) in todo.items():
+            render_one(name, data, path, dpi)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_one, name, data, path, dpi) for name, (data, path, _) in todo.items()]
+            for future in futures:
+                future.result()
+
+    for name, (_, path, key) in todo.items():
+        manifest.setdefault(name, {})[path] = key
+        results[name] = (path, "saved")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return results
@@ -0,0 +1,308 @@
+import argparse
+import glob
+import json
+import os
+import select
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import injury_counts
+import injury_db
+import opposition
+import pipeline
+import schema
+import similarity
+import storage
+
+# ---------------------------------------------------------
+# Streaming ingestion of new injury records
+# ---------------------------------------------------------
+# Records are JSON objects with the raw file's columns, e.g.
+#   {"Name": "...", "Team Name": "...", "Season": "2023/24",
+#    "Date of Injury": "Nov 9, 2023", "Match1_before_injury_GD": "1", ...}
+# read one per line from stdin or from *.jsonl files dropped into a
+# watched folder. Each batch is cleaned with the same rules as the
+# pipeline, scored, appended to the raw file and folded into the
+# running per-player sums and counts, which costs the same however much
+# history is loaded. The pipeline tables and the stores derived from
+# them are republished every PUBLISH_EVERY batches and when the input
+# runs dry: stdin is idle for IDLE_SECONDS, the watched folder has no
+# new files, or the input ends (see Ingestor.publish). Records appended to the raw file but
+# not published yet, e.g. after a crash, are picked up by
+# `pipeline.py --incremental`.
+PUBLISH_EVERY = 10
+IDLE_SECONDS = 5.0
+
+
+class RunningSummary:
+    """Per-player, per-phase sums and counts kept in dicts.
+
+    Adding an injury touches at most one entry per phase, and only the
+    touched players are re-finalized, so each event costs O(1)
+    regardless of how much history is loaded.
+    """
+
+    def __init__(self, state):
+        self.columns = state.columns
+        self.phases = {}
+        for (name, phase), values in zip(state.index, state.to_numpy(dtype=float)):
+            self.phases.setdefault(name, {})[str(phase)] = values.copy()
+
+    def add(self, state):
+        touched = set()
+        for (name, phase), values in zip(state.index, state.to_numpy(dtype=float)):
+            player = self.phases.setdefault(name, {})
+            if str(phase) in player:
+                player[str(phase)] += values
+            else:
+                player[str(phase)] = values.copy()
+            touched.add(name)
+        return touched
+
+    def summary(self, names):
+        keys = [(name, phase) for name in names for phase in self.phases.get(name, {})]
+        values = [self.phases[name][phase] for name, phase in keys]
+        state = pd.DataFrame(
+            np.array(values).reshape(len(values), len(self.columns)),
+            index=pd.MultiIndex.from_tuples(keys, names=pipeline.STATE_LEVELS),
+            columns=self.columns,
+        )
+        return pipeline.finalize_summary(state, list(names))
+
+
+class Ingestor:
+    def __init__(self, raw_path=pipeline.RAW_CSV, metrics=pipeline.METRICS, summary=pipeline.SUMMARY,
+                 matches=pipeline.MATCHES, counts=pipeline.COUNTS, db=injury_db.DB_FILE,
+                 similarity_index=similarity.INDEX_FILE, append_raw=True, publish_every=PUBLISH_EVERY):
+        self.raw_path = raw_path
+        self.counts_path = counts
+        self.db_path = db
+        self.similarity_path = similarity_index
+        self.append_raw = append_raw
+        self.publish_every = publish_every
+        self.pending, self.touched = [], set()
+        self.paths = {name: storage.find_table(stem) for name, stem in
+                      [("metrics", metrics), ("summary", summary), ("matches", matches)]}
+        missing = [name for name, path in self.paths.items() if path is None]
+        if missing:
+            raise FileNotFoundError(f"Missing pipeline tables ({', '.join(missing)}), run pipeline.py first")
+
+        self.detailed = storage.read_table(self.paths["metrics"])
+        self.long = storage.read_table(self.paths["matches"])
+        self.summary = storage.read_table(self.paths["summary"]).set_index("Name")
+        self.running = RunningSummary(pipeline.summary_state(self.detailed, self.long))
+
+        # Occurrences of each Name + Date + Season key in the raw file,
+        # so new ids continue the numbering of the pipeline
+        self.raw_columns = list(pd.read_csv(raw_path, nrows=0).columns)
+        keys = pipeline.injury_keys(pd.read_csv(raw_path, usecols=pipeline.KEY_COLS, na_values=pipeline.NA_TOKENS))
+        self.key_counts = keys.value_counts().to_dict()
+
+    def validate(self, records, rejected):
+        good = []
+        for lineno, record in records:
+            if not isinstance(record, dict):
+                rejected.append((lineno, "not a JSON object"))
+                continue
+            missing = [field for field in schema.REQUIRED if record.get(field) in (None, "")]
+            if missing:
+                rejected.append((lineno, f"missing {', '.join(missing)}"))
+                continue
+            good.append((lineno, record))
+        return good
+
+    def ingest(self, records, rejected=()):
+        rejected = list(rejected)
+        good = self.validate(records, rejected)
+        accepted = 0
+        if good:
+            lines = [lineno for lineno, _ in good]
+            raw = pd.DataFrame([record for _, record in good], index=lines).reindex(columns=self.raw_columns)
+            raw.insert(0, "injury_id", pipeline.injury_ids(raw, self.key_counts))
+
+            # JSON values may arrive as strings; columns that are numeric in
+            # the pipeline tables (e.g. Age) are parsed like read_csv would.
+            # Ratings and GDs are left to pipeline.clean.
+            coerced_by_clean = set(pipeline.numeric_cols(raw))
+            for col in raw.columns:
+                if (col in self.detailed.columns and col not in coerced_by_clean
+                        and pd.api.types.is_numeric_dtype(self.detailed[col])):
+                    raw[col] = pd.to_numeric(raw[col], errors="coerce")
+
+            # Same rules as the pipeline: records that fail the raw schema
+            # or have no Match1/Match2 data at all are rejected, numeric
+            # cells are coerced
+            raw, invalid = pipeline.validate(raw)
+            for lineno, reason in invalid["reason"].items():
+                rejected.append((lineno, reason))
+            cleaned, report = pipeline.clean(raw, return_report=True)
+            for lineno in raw.index.difference(cleaned.index):
+                rejected.append((lineno, "all Match1 and Match2 values are missing"))
+            pipeline.print_coercion_report(report)
+
+            if not cleaned.empty:
+                self.apply(raw.loc[cleaned.index], cleaned)
+                accepted = len(cleaned)
+
+        for lineno, reason in rejected:
+            print(f"Rejected record {lineno}: {reason}", file=sys.stderr)
+        return accepted, len(rejected)
+
+    def apply(self, raw, cleaned):
+        long = pipeline.to_long(cleaned)
+        detailed = pipeline.add_metrics(cleaned, long)
+
+        self.touched |= self.running.add(pipeline.summary_state(detailed, long))
+        self.pending.append((detailed, long))
+        for key, count in pipeline.injury_keys(raw).value_counts().items():
+            self.key_counts[key] = self.key_counts.get(key, 0) + count
+
+        if self.append_raw:
+            self.append_to_raw(raw.drop(columns="injury_id"))
+
+        for row in detailed.itertuples(index=False):
+            print(f"Ingested {row.Name} ({row.Injury}): "
+                  f"drop index {row.Team_Performance_Drop_Index:.3f}, "
+                  f"rating {row.Player_Avg_Rating_Before_Injury:.2f} -> {row.Player_Avg_Rating_After_Injury:.2f}")
+        if len(self.pending) >= self.publish_every:
+            self.publish()
+
+    def append_to_raw(self, raw):
+        with open(self.raw_path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        raw.to_csv(self.raw_path, mode="a", header=False, index=False)
+
+    def publish(self):
+        """Write the pipeline tables and derived stores with the batches since the last call."""
+        if not self.pending:
+            return
+        detailed, long = (pd.concat(frames, ignore_index=True) for frames in zip(*self.pending))
+        self.detailed = pd.concat([self.detailed, detailed], ignore_index=True)
+        self.long = pd.concat([self.long, long], ignore_index=True)
+        fresh = self.running.summary(sorted(self.touched)).set_index("Name")
+        self.summary = pd.concat([self.summary.drop(index=fresh.index, errors="ignore"), fresh]).sort_index()
+
+        # Columnar files cannot be appended to, so the tables are rewritten
+        # once per publish. Opponent strengths change with every match, so
+        # the adjusted columns are redone too; the SQLite store and the
+        # similarity index only get the new injuries.
+        self.detailed, summary, self.long = opposition.apply(self.detailed, self.summary.reset_index(), self.long)
+        self.summary = summary.set_index("Name")
+        storage.write_table(self.long, self.paths["matches"])
+        storage.write_table(self.detailed, self.paths["metrics"])
+        storage.write_table(self.summary.reset_index(), self.paths["summary"])
+        injury_counts.write(self.detailed, self.counts_path)
+        injury_db.update(self.detailed, self.long, self.summary.reset_index(), detailed["injury_id"], self.db_path)
+        similarity.update(self.detailed, self.long, detailed["injury_id"], self.similarity_path)
+        print(f"Published {len(detailed)} new injuries ({len(self.touched)} players updated).")
+        self.pending, self.touched = [], set()
+
+
+def parse_lines(lines, source="stdin", start=1):
+    records, rejected = [], []
+    for lineno, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append((f"{source}:{lineno}", json.loads(line)))
+        except json.JSONDecodeError as e:
+            rejected.append((f"{source}:{lineno}", f"invalid JSON ({e.msg})"))
+    return records, rejected
+
+
+def stdin_lines(idle):
+    """Lines of stdin as they arrive, and None after every `idle` seconds without input."""
+    fd = sys.stdin.fileno()
+    pending = b""
+    while True:
+        ready, _, _ = select.select([fd], [], [], idle)
+        if not ready:
+            yield None
+            continue
+        chunk = os.read(fd, 1 << 16)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8") + "\n"
+    if pending:
+        yield pending.decode("utf-8")
+
+
+def read_stdin(ingestor, batch_size, idle=IDLE_SECONDS):
+    # select() only works on pipes outside Windows; there (or with idle
+    # 0) pending batches wait for --publish-every or the end of stdin
+    lines = stdin_lines(idle) if idle and sys.platform != "win32" else sys.stdin
+    batch, start, lineno = [], 1, 0
+    for line in lines:
+        if line is None:
+            # Nothing new for a while: publish what is pending, like
+            # watch_folder does when the folder has no new files
+            if batch:
+                ingestor.ingest(*parse_lines(batch, "stdin", start))
+                batch, start = [], lineno + 1
+            ingestor.publish()
+            continue
+        lineno += 1
+        batch.append(line)
+        if len(batch) >= batch_size:
+            ingestor.ingest(*parse_lines(batch, "stdin", start))
+            batch, start = [], lineno + 1
+    if batch:
+        ingestor.ingest(*parse_lines(batch, "stdin", start))
+    ingestor.publish()
+
+
+def watch_folder(ingestor, folder, interval):
+    done = os.path.join(folder, "processed")
+    os.makedirs(done, exist_ok=True)
+    print(f"Watching {folder} for *.jsonl files (Ctrl+C to stop)")
+    while True:
+        paths = sorted(glob.glob(os.path.join(folder, "*.jsonl")))
+        for path in paths:
+            with open(path) as f:
+                ingestor.ingest(*parse_lines(f, os.path.basename(path)))
+            shutil.move(path, os.path.join(done, os.path.basename(path)))
+        if not paths:
+            # Nothing new: a good moment to publish what is pending
+            ingestor.publish()
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest new injury records (JSONL) into the pipeline tables.")
+    parser.add_argument("--watch", metavar="DIR", help="poll DIR for *.jsonl files instead of reading stdin")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls of --watch")
+    parser.add_argument("--batch-size", type=int, default=100, help="stdin records per batch")
+    parser.add_argument("--idle", type=float, default=IDLE_SECONDS, metavar="SECONDS",
+                        help="publish pending stdin records after SECONDS without input (0 = only at the end)")
+    parser.add_argument("--publish-every", type=int, default=PUBLISH_EVERY, metavar="N",
+                        help="rewrite the pipeline tables every N batches (also when the input runs dry; "
+                             "1 with --batch-size 1 publishes every record immediately)")
+    parser.add_argument("--raw", default=pipeline.RAW_CSV, help="raw CSV the records are appended to")
+    parser.add_argument("--no-raw-append", action="store_true",
+                        help="do not append accepted records to the raw CSV")
+    args = parser.parse_args(argv)
+
+    ingestor = Ingestor(args.raw, append_raw=not args.no_raw_append, publish_every=args.publish_every)
+    if args.watch:
+        try:
+            watch_folder(ingestor, args.watch, args.interval)
+        except KeyboardInterrupt:
+            ingestor.publish()
+    else:
+        read_stdin(ingestor, args.batch_size, args.idle)
+
+
+if __name__ == "__main__":
+    main()
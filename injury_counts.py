@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import schema
+
+# ---------------------------------------------------------
+# Injury count cube: team x season x month x injury x position
+# ---------------------------------------------------------
+# Written by the pipeline as a compressed .npz holding the labels of
+# every axis and one entry per combination that occurs in the data: an
+# int32 code into each axis's labels plus the injury count. Combinations
+# without injuries are not stored, so the file grows with the data rather
+# than with the product of the axis sizes. Any filter and any pair of
+# axes (e.g. team x month for knee injuries in 2020/21) is a mask and a
+# grouped sum over these arrays, without touching the rows.
+#
+# Month is 1-12; injuries whose date cannot be parsed are counted under
+# UNKNOWN_MONTH (0) so totals still add up, and are not shown as a month.
+AXES = ["Team Name", "Season", "Injury_Month", "Injury", "Position"]
+MONTHS = list(range(13))
+UNKNOWN_MONTH = 0
+UNKNOWN = "Unknown"
+
+
+def axis_values(df):
+    if "Injury_Month" in df.columns:
+        months = df["Injury_Month"].astype(float)
+    else:
+        months = schema.parse_dates(df["Date of Injury"]).dt.month
+    values = {"Injury_Month": months.fillna(UNKNOWN_MONTH).astype(int)}
+    for axis in AXES:
+        if axis != "Injury_Month":
+            values[axis] = df[axis].astype(object).where(df[axis].notna(), UNKNOWN).astype(str).str.strip()
+    return values
+
+
+@instrument.profiled("injury_counts.build")
+def build(df):
+    """Return {"counts": ndarray, "codes": {axis: ndarray}, "<axis>": labels} for the detailed table `df`."""
+    values = axis_values(df)
+    labels, codes = {}, []
+    for axis in AXES:
+        if axis == "Injury_Month":
+            labels[axis] = np.array(MONTHS)
+            codes.append(values[axis].to_numpy())
+        else:
+            code, uniques = pd.factorize(values[axis], sort=True)
+            labels[axis] = np.asarray(uniques, dtype=str)
+            codes.append(code)
+
+    shape = tuple(len(labels[axis]) for axis in AXES)
+    seen, counts = np.unique(np.ravel_multi_index(codes, shape), return_counts=True)
+    combos = np.unravel_index(seen, shape)
+    return {"counts": counts.astype(np.int32),
+            "codes": {axis: code.astype(np.int32) for axis, code in zip(AXES, combos)},
+            **labels}
+
+
+def key(name):
+    return name.replace(" ", "_")
+
+
+def write(df, path):
+    cube = build(df)
+    arrays = {key(axis): cube[axis] for axis in AXES}
+    arrays.update({f"codes_{key(axis)}": code for axis, code in cube["codes"].items()})
+    # np.savez adds .npz itself; the temporary name keeps readers from
+    # seeing a half-written file
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, counts=cube["counts"], **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load(path):
+    with np.load(path) as data:
+        cube = {axis: data[key(axis)] for axis in AXES}
+        cube["counts"] = data["counts"]
+        cube["codes"] = {axis: data[f"codes_{key(axis)}"] for axis in AXES}
+    return cube
+
+
+def select(cube, rows, columns=None, filters=None):
+    """Counts summed over every axis except `rows` (and `columns`).
+
+    `filters` maps an axis to the labels to keep, e.g.
+    select(cube, "Team Name", "Injury_Month", {"Injury": ["Knee injury"], "Season": ["2020/21"]}).
+    Every kept label of `rows` and `columns` is in the result, with 0
+    where it has no injuries.
+    """
+    labels = {axis: cube[axis] for axis in AXES}
+    codes = dict(cube["codes"])
+    keep = np.ones(len(cube["counts"]), dtype=bool)
+    for axis, chosen in (filters or {}).items():
+        if chosen is None or len(chosen) == 0:
+            continue
+        kept = np.isin(labels[axis], list(chosen))
+        keep &= kept[codes[axis]]
+        # renumber the codes to the kept labels
+        codes[axis] = (np.cumsum(kept) - 1)[codes[axis]]
+        labels[axis] = labels[axis][kept]
+
+    counts = cube["counts"][keep]
+    n_rows = len(labels[rows])
+    n_columns = len(labels[columns]) if columns else 1
+    flat = codes[rows][keep] * n_columns
+    if columns:
+        flat = flat + codes[columns][keep]
+    summed = np.bincount(flat, weights=counts, minlength=n_rows * n_columns).astype(np.int64)
+    if columns is None:
+        return pd.Series(summed, index=pd.Index(labels[rows], name=rows), name="Injuries")
+    return pd.DataFrame(summed.reshape(n_rows, n_columns), index=pd.Index(labels[rows], name=rows),
+                        columns=pd.Index(labels[columns], name=columns))
@@ -0,0 +1,201 @@
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+import instrument
+import opposition
+import schema
+
+# ---------------------------------------------------------
+# Embedded SQL store (SQLite file) for ad-hoc queries
+# ---------------------------------------------------------
+# The pipeline also writes its three tables to DB_FILE:
+#   injuries  - the detailed per-injury table (cleaned_with_metrics)
+#   matches   - the long match table (injury_matches)
+#   summary   - the per-player phase summary
+# with INDEXES on the columns filters use, so a query for one team or
+# injury type reads a few rows instead of scanning a whole table. Dates
+# are stored as ISO text and text columns without surrounding spaces.
+# Incremental runs and the ingestor change it in place (update()).
+# Nothing but the sqlite3 module of the standard library is needed.
+DB_FILE = "injuries.sqlite"
+INDEXES = {
+    "injuries": ["Name", "Team Name", "Season", "Injury", "Position", "injury_id"],
+    "matches": ["injury_id", "phase"],
+    "summary": ["Name"],
+}
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def to_sql_frame(df):
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[col]):
+            text = df[col].astype(object)
+            df[col] = text.where(text.isna(), text.astype(str).str.strip())
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%Y-%m-%d").astype(object).where(df[col].notna(), None)
+    return df
+
+
+def write_tables(tables, path=DB_FILE):
+    """Write {table name: DataFrame} to a fresh database file and index it."""
+    # Built next to the target and renamed, so a reader never sees half a database
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    with sqlite3.connect(tmp) as con:
+        for name, df in tables.items():
+            to_sql_frame(df).to_sql(name, con, index=False)
+            for col in INDEXES.get(name, []):
+                if col in df.columns:
+                    con.execute(f"CREATE INDEX {quote(f'{name}_{col}')} ON {quote(name)} ({quote(col)})")
+        con.execute("ANALYZE")
+    con.close()
+    os.replace(tmp, path)
+    return path
+
+
+@instrument.profiled("injury_db.write")
+def write(detailed, long, summary, path=DB_FILE):
+    return write_tables({"injuries": detailed, "matches": long, "summary": summary}, path)
+
+
+def insert_rows(con, table, df):
+    # executemany instead of DataFrame.to_sql, which commits on its own
+    df = to_sql_frame(df)
+    values = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    con.executemany(f"INSERT INTO {quote(table)} ({', '.join(map(quote, df.columns))}) "
+                    f"VALUES ({', '.join('?' * len(df.columns))})", values)
+
+
+def refresh_adjusted(con, detailed, long):
+    # The opposition-adjusted values of every match move when any match
+    # changes (see opposition.py). They are set in place with one UPDATE
+    # per table instead of rewriting the rows and their indexes.
+    table, average = opposition.expected(long)
+    con.execute("CREATE TEMP TABLE expected (opposition TEXT PRIMARY KEY, GD REAL, points REAL)")
+    con.executemany("INSERT INTO expected VALUES (?, ?, ?)",
+                    zip(table.index.astype(str).str.strip(), table["expected_GD"].astype(float),
+                        table["expected_points"].astype(float)))
+    lookup = "SELECT {} FROM expected WHERE expected.opposition = matches.opposition"
+    con.execute(f"UPDATE matches SET adj_GD = GD - COALESCE(({lookup.format('GD')}), ?), "
+                f"adj_points = points - COALESCE(({lookup.format('points')}), ?)",
+                (float(average["GD"]), float(average["points"])))
+
+    cols = opposition.INJURY_COLS
+    values = detailed[cols].astype(float).astype(object).where(detailed[cols].notna(), None)
+    con.executemany(f"UPDATE injuries SET {', '.join(f'{quote(col)} = ?' for col in cols)} WHERE injury_id = ?",
+                    zip(*[values[col] for col in cols], detailed["injury_id"]))
+
+
+@instrument.profiled("injury_db.update")
+def update(detailed, long, summary, stale_ids, path=DB_FILE):
+    """Apply an incremental run to the store instead of writing it again.
+
+    The rows of the `stale_ids` injuries (new, changed or removed) are
+    deleted and those still in `detailed` / `long` inserted, the summary
+    (one row per player) is replaced and the opposition-adjusted columns
+    are refreshed, all in one transaction. A store written with other
+    columns is rebuilt with write().
+    """
+    if not os.path.exists(path) or any(table_columns(name, path) != list(df.columns) for name, df in
+                                       [("injuries", detailed), ("matches", long), ("summary", summary)]):
+        return write(detailed, long, summary, path)
+
+    stale_ids = pd.Index(stale_ids)
+    con = sqlite3.connect(path)
+    try:
+        with con:
+            con.execute("CREATE TEMP TABLE stale (injury_id TEXT PRIMARY KEY)")
+            con.executemany("INSERT INTO stale VALUES (?)", ((injury_id,) for injury_id in stale_ids))
+            for name, df in [("injuries", detailed), ("matches", long)]:
+                con.execute(f"DELETE FROM {name} WHERE injury_id IN (SELECT injury_id FROM stale)")
+                insert_rows(con, name, df[df["injury_id"].isin(stale_ids)])
+            con.execute("DELETE FROM summary")
+            insert_rows(con, "summary", summary)
+            refresh_adjusted(con, detailed, long)
+    finally:
+        con.close()
+    return path
+
+
+def connect(path=DB_FILE):
+    """Read-only connection to the store."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No database at '{path}', run pipeline.py first")
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+@instrument.profiled("injury_db.query")
+def query(sql, params=(), path=DB_FILE):
+    """Result of `sql` (with ? placeholders for `params`) as a DataFrame with schema dtypes."""
+    con = connect(path)
+    try:
+        df = pd.read_sql_query(sql, con, params=list(params))
+    finally:
+        con.close()
+    return schema.apply(df)
+
+
+def table_columns(table, path=DB_FILE):
+    con = connect(path)
+    try:
+        return [row[1] for row in con.execute(f"PRAGMA table_info({quote(table)})")]
+    finally:
+        con.close()
+
+
+def select(table, columns=None, filters=None, distinct=False, path=DB_FILE):
+    """Rows of `table` whose columns are in the given values, filtered by SQLite.
+
+    e.g. select("injuries", ["Name", "Injury"], {"Team Name": ["Arsenal"], "Season": ["2020/21"]}).
+    Empty filter lists are ignored.
+    """
+    known = table_columns(table, path)
+    unknown = [col for col in list(columns or []) + list(filters or {}) if col not in known]
+    if unknown:
+        raise KeyError(f"Unknown columns for '{table}': {', '.join(unknown)}")
+
+    where, params = [], []
+    for col, values in (filters or {}).items():
+        values = [values] if isinstance(values, str) else list(values)
+        if values:
+            where.append(f"{quote(col)} IN ({', '.join('?' * len(values))})")
+            params += [str(value).strip() for value in values]
+    sql = (f"SELECT {'DISTINCT ' if distinct else ''}{', '.join(map(quote, columns)) if columns else '*'} "
+           f"FROM {quote(table)}" + (f" WHERE {' AND '.join(where)}" if where else ""))
+    return query(sql, params, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Query the injury database, e.g. "
+                    "'SELECT Injury, COUNT(*) AS n FROM injuries GROUP BY Injury ORDER BY n DESC LIMIT 5'.")
+    parser.add_argument("sql", nargs="?", help="SQL query (tables: injuries, matches, summary)")
+    parser.add_argument("params", nargs="*", help="values for ? placeholders in the query")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--tables", action="store_true", help="list the tables and their columns")
+    parser.add_argument("--csv", action="store_true", help="print the result as CSV")
+    args = parser.parse_args(argv)
+
+    if args.tables:
+        for table in INDEXES:
+            print(f"{table}: {', '.join(table_columns(table, args.db))}")
+    if args.sql:
+        try:
+            result = query(args.sql, args.params, args.db)
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            parser.exit(1, f"Query failed: {e}\n")
+        print(result.to_csv(index=False) if args.csv else result.to_string(index=False))
+    elif not args.tables:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# ---------------------------------------------------------
+# Per-stage timing and memory instrumentation
+# ---------------------------------------------------------
+# Off by default. Switch it on with SPORTHURT_PROFILE=1 (or --profile
+# on the scripts that have flags); each stage then logs one JSON line
+# to stderr with wall time, peak memory and rows/columns in and out:
+#
+#   {"stage": "pipeline.clean", "seconds": 0.21, "peak_mb": 3.1,
+#    "rss_mb": 182.4, "rows_in": 656, "cols_in": 43, "rows_out": 656, ...}
+#
+# SPORTHURT_PROFILE=<path> appends the JSON lines to that file instead.
+#
+#   with instrument.stage("eda.clubs", df) as s:
+#       clubs = ...
+#       s.output(clubs)
+#
+#   @instrument.profiled("pipeline.clean")
+#   def clean(df): ...
+ENV_VAR = "SPORTHURT_PROFILE"
+
+logger = logging.getLogger("sporthurt.profile")
+_local = threading.local()
+
+# tracemalloc slows every allocation, so it only runs while a stage is
+# open in some thread; it is stopped again after the last outermost
+# stage unless something else had started it
+_tracing_lock = threading.Lock()
+_tracing = {"stages": 0, "started": False}
+
+
+def enabled():
+    return os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+def enable(target="1"):
+    # Set through the environment so worker processes inherit it
+    os.environ[ENV_VAR] = target
+    _configure_logger()
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    target = os.environ.get(ENV_VAR, "1")
+    handler = logging.StreamHandler(sys.stderr) if target == "1" else logging.FileHandler(target)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack, _local.collectors = [], []
+    return _local.stack
+
+
+def shape(data):
+    """(rows, columns) of a DataFrame/Series, or of the first one in a tuple."""
+    if isinstance(data, tuple):
+        data = next((d for d in data if isinstance(d, (pd.DataFrame, pd.Series))), None)
+    if isinstance(data, pd.DataFrame):
+        return data.shape
+    if isinstance(data, pd.Series):
+        return len(data), 1
+    return None, None
+
+
+def rss_mb():
+    # The resource module is Unix-only (None on Windows); ru_maxrss is
+    # in KB on Linux and bytes on macOS
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _start_tracing():
+    with _tracing_lock:
+        if _tracing["stages"] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing["started"] = True
+        _tracing["stages"] += 1
+
+
+def _stop_tracing():
+    with _tracing_lock:
+        _tracing["stages"] -= 1
+        if _tracing["stages"] == 0 and _tracing["started"]:
+            tracemalloc.stop()
+            _tracing["started"] = False
+
+
+class stage:
+    """Time one step; a no-op unless profiling is on or a collector is active."""
+
+    def __init__(self, name, data=None):
+        self.name = name
+        self.data = data
+        self.record = None
+
+    def __enter__(self):
+        stack = _stack()
+        self.active = enabled() or bool(_local.collectors)
+        if not self.active:
+            return self
+        if not stack:
+            _start_tracing()
+
+        # The tracemalloc peak is global, so the enclosing stage keeps the
+        # highest peak of its children before it is reset for this one
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        tracemalloc.reset_peak()
+        self.mem_start = current
+        self.child_peak = 0
+        self.rows_in, self.cols_in = shape(self.data)
+        self.rows_out = self.cols_out = None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def output(self, data):
+        if self.active:
+            self.rows_out, self.cols_out = shape(data)
+        return data
+
+    def __exit__(self, *exc):
+        if not self.active:
+            return False
+        seconds = time.perf_counter() - self.start
+        peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        else:
+            _stop_tracing()
+
+        rss = rss_mb()
+        self.record = {
+            "stage": self.name,
+            "seconds": round(seconds, 4),
+            "peak_mb": round((peak - self.mem_start) / 2**20, 2),
+            "rss_mb": None if rss is None else round(rss, 1),
+            "rows_in": self.rows_in,
+            "cols_in": self.cols_in,
+            "rows_out": self.rows_out,
+            "cols_out": self.cols_out,
+            "depth": len(stack),
+        }
+        if exc[0] is not None:
+            self.record["error"] = exc[0].__name__
+        if enabled():
+            _configure_logger()
+            logger.info(json.dumps(self.record))
+        for records in _local.collectors:
+            records.append(self.record)
+        return False
+
+
+def profiled(name=None):
+    """Decorator form of `stage`; input is the first DataFrame argument."""
+    def decorate(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            data = next((a for a in args if isinstance(a, (pd.DataFrame, pd.Series))), None)
+            with stage(label, data) as s:
+                return s.output(fn(*args, **kwargs))
+        return wrapper
+    return decorate
+
+
+class collect:
+    """Gather the records of every stage run in this thread, e.g. for a debug panel."""
+
+    def __enter__(self):
+        _stack()
+        self.records = []
+        _local.collectors.append(self.records)
+        return self.records
+
+    def __exit__(self, *exc):
+        _local.collectors.remove(self.records)
+        return False
@@ -0,0 +1,129 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+import api
+
+# ---------------------------------------------------------
+# Load test of the JSON service (api.py)
+# ---------------------------------------------------------
+# Sends --requests GETs from --concurrency threads, drawn at random from
+# the dashboard's requests (every endpoint, with filters and players
+# taken from /options and /players), and reports throughput, latency
+# percentiles and the response-cache hit rate per endpoint. Without
+# --url a server is started in this process on the tables in the
+# current directory.
+REQUESTS = 2000
+CONCURRENCY = 16
+SEED = 0
+PERCENTILES = [50, 95, 99]
+
+
+def request_mix(url, rng, count):
+    """`count` random request paths, e.g. "/player-timeline?name=...", as the dashboard sends them."""
+    options = api.fetch(url, "options")
+    names = api.fetch(url, "players")
+    teams, injuries = options["players"]["Team Name"], options["heatmap"]["Injury"]
+
+    def pick(values, most=2):
+        return list(rng.choice(values, size=rng.integers(0, most + 1), replace=False)) if values else []
+
+    makers = [
+        lambda: ("/top-injuries", {"measure": rng.choice(api.MEASURES), "significant": int(rng.integers(2))}),
+        lambda: ("/players", {"team": pick(teams)}),
+        lambda: ("/player-timeline", {"name": rng.choice(names)}),
+        lambda: ("/heatmap", {"injury": pick(injuries)}),
+        lambda: ("/age-vs-delta", {}),
+        lambda: ("/leaderboard", {}),
+        lambda: ("/recovery", {}),
+    ]
+    paths = []
+    for maker in rng.choice(makers, size=count):
+        endpoint, params = maker()
+        query = urlencode(params, doseq=True)
+        paths.append((endpoint, endpoint + (f"?{query}" if query else "")))
+    return paths
+
+
+def timed_get(url, path):
+    start = time.perf_counter()
+    try:
+        with urlopen(url + path, timeout=api.TIMEOUT) as response:
+            response.read()
+            status, cache = response.status, response.headers.get("X-Cache")
+    except HTTPError as e:
+        status, cache = e.code, None
+    return time.perf_counter() - start, status, cache
+
+
+def run(url, requests=REQUESTS, concurrency=CONCURRENCY, seed=SEED):
+    """One row per request: endpoint, seconds, status and cache (hit/miss)."""
+    paths = request_mix(url, np.random.default_rng(seed), requests)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda item: timed_get(url, item[1]), paths))
+    return pd.DataFrame(results, columns=["seconds", "status", "cache"]).assign(
+        endpoint=[endpoint for endpoint, _ in paths])
+
+
+def report(results, elapsed):
+    ms = results["seconds"] * 1000
+    groups = ms.groupby(results["endpoint"])
+    table = pd.DataFrame({"requests": groups.size()})
+    for p in PERCENTILES:
+        table[f"p{p}_ms"] = groups.quantile(p / 100)
+    table["max_ms"] = groups.max()
+    table["hit_rate"] = (results["cache"] == "hit").groupby(results["endpoint"]).mean()
+    table.loc["all"] = [len(results), *np.percentile(ms, PERCENTILES), ms.max(), (results["cache"] == "hit").mean()]
+
+    summary = {
+        "requests": len(results),
+        "seconds": elapsed,
+        "requests_per_second": len(results) / elapsed,
+        "errors": int((results["status"] != 200).sum()),
+    }
+    return summary, table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test of the JSON service (api.py).")
+    parser.add_argument("--url", default=None, help="service URL (default: start one on the local tables)")
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = api.make_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://{api.HOST}:{server.server_address[1]}"
+
+    try:
+        start = time.perf_counter()
+        results = run(url, args.requests, args.concurrency, args.seed)
+        summary, table = report(results, time.perf_counter() - start)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    print(f"{summary['requests']} requests from {args.concurrency} threads in {summary['seconds']:.2f}s: "
+          f"{summary['requests_per_second']:.0f} requests/s, {summary['errors']} errors")
+    print(table.round(2).to_string())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**summary, "endpoints": table.reset_index(names="endpoint").to_dict(orient="records")}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
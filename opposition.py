@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+import instrument
+import schema
+
+# ---------------------------------------------------------
+# Opposition strength: GDs and results adjusted for the opponent
+# ---------------------------------------------------------
+# The strength of an opponent is the GD and points teams in the data
+# got against it (one groupby over the long match table). Opponents
+# with few matches are pulled towards the overall average by
+# PRIOR_MATCHES matches at that average. A match's adjusted GD / result
+# is its GD / points minus what was expected against that opponent, so
+# losing 2-0 to Man City counts as less of a drop than losing to Norwich.
+#
+# The lookup depends on every match, so the adjusted columns of the
+# detailed table and the summary are always recomputed over the whole
+# long table, with array lookups and groupbys only.
+PRIOR_MATCHES = 5
+INJURY_COLS = ["Avg_Adj_GD_Before_Injury", "Avg_Adj_GD_Missed_Matches", "Adj_Team_Performance_Drop_Index"]
+SUMMARY_SOURCES = {
+    "Team_Avg_Adj_GD_Before_Injury": ("adj_GD", "before_injury"),
+    "Team_Avg_Adj_Result_Before_Injury": ("adj_points", "before_injury"),
+    "Team_Avg_Adj_GD_Missed": ("adj_GD", "missed_match"),
+    "Team_Avg_Adj_Result_Missed": ("adj_points", "missed_match"),
+    "Team_Avg_Adj_GD_After": ("adj_GD", "after_injury"),
+    "Team_Avg_Adj_Result_After": ("adj_points", "after_injury"),
+}
+SUMMARY_COLS = list(SUMMARY_SOURCES) + ["Adj_Team_Performance_Drop", "Adj_Team_Rebound_Index"]
+
+
+def opponents(long):
+    return long["opposition"].astype(object).where(long["opposition"].notna()).str.strip()
+
+
+@instrument.profiled("opposition.strength")
+def strength(long):
+    """Expected GD and points against each opponent, indexed by opposition."""
+    values = long[["GD", "points"]].astype(float)
+    groups = values.groupby(opponents(long))
+    sums, counts = groups.sum(), groups.count()
+    average = values.mean()
+    expected = (sums + PRIOR_MATCHES * average) / (counts + PRIOR_MATCHES)
+    return pd.DataFrame({
+        "matches": counts["GD"],
+        "expected_GD": expected["GD"],
+        "expected_points": expected["points"],
+    }).rename_axis("opposition")
+
+
+def expected(long):
+    """Expected GD and points per opponent, and for matches without a known opponent."""
+    # Matches without a known opponent are compared to the overall average
+    average = long[["GD", "points"]].astype(float).mean()
+    return strength(long)[["expected_GD", "expected_points"]], average
+
+
+def adjust(long):
+    """`long` with adj_GD and adj_points (GD / points minus the opponent's expected value)."""
+    table, average = expected(long)
+    expected_values = np.vstack([table.to_numpy(dtype=float), average.to_numpy()])
+    position = table.index.get_indexer(opponents(long))
+    position[position < 0] = len(table)
+    expected_values = expected_values[position]
+    return long.assign(
+        adj_GD=long["GD"].astype(float).to_numpy() - expected_values[:, 0],
+        adj_points=long["points"].astype(float).to_numpy() - expected_values[:, 1],
+    )
+
+
+def add_injury_metrics(detailed, long):
+    means = long["adj_GD"].groupby([long["injury_id"], long["phase"]], observed=True).mean().unstack("phase")
+    means = means.reindex(index=detailed["injury_id"], columns=schema.PHASES)
+
+    detailed = detailed.drop(columns=INJURY_COLS, errors="ignore")
+    detailed["Avg_Adj_GD_Before_Injury"] = means["before_injury"].to_numpy()
+    detailed["Avg_Adj_GD_Missed_Matches"] = means["missed_match"].to_numpy()
+    detailed["Adj_Team_Performance_Drop_Index"] = (
+        detailed["Avg_Adj_GD_Before_Injury"] - detailed["Avg_Adj_GD_Missed_Matches"]
+    )
+    return detailed
+
+
+def add_player_metrics(summary, detailed, long):
+    # Per player and phase, every match weighs the same (as in the summary)
+    names = pd.Series(detailed["Name"].to_numpy(), index=detailed["injury_id"].to_numpy())
+    keys = [long["injury_id"].map(names).rename("Name"), long["phase"]]
+    per_phase = long[["adj_GD", "adj_points"]].groupby(keys, observed=True).mean().unstack("phase")
+    per_phase = per_phase.reindex(index=summary["Name"],
+                                  columns=pd.MultiIndex.from_product([["adj_GD", "adj_points"], schema.PHASES]))
+
+    summary = summary.drop(columns=SUMMARY_COLS, errors="ignore")
+    for out_col, source in SUMMARY_SOURCES.items():
+        summary[out_col] = per_phase[source].to_numpy()
+    summary["Adj_Team_Performance_Drop"] = summary["Team_Avg_Adj_GD_Before_Injury"] - summary["Team_Avg_Adj_GD_Missed"]
+    summary["Adj_Team_Rebound_Index"] = summary["Team_Avg_Adj_GD_After"] - summary["Team_Avg_Adj_GD_Missed"]
+    return summary
+
+
+@instrument.profiled("opposition.apply")
+def apply(detailed, summary, long):
+    """Adjusted columns for the long table, the detailed table and the summary."""
+    long = adjust(long)
+    return add_injury_metrics(detailed, long), add_player_metrics(summary, detailed, long), long
@@ -0,0 +1,745 @@
+import argparse
+import glob
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import cleaning
+import injury_counts
+import injury_db
+import instrument
+import opposition
+import schema
+import similarity
+import storage
+
+# ---------------------------------------------------------
+# Default file locations (outputs get their extension from
+# the storage format, see storage.py)
+# ---------------------------------------------------------
+RAW_CSV = "player_injuries_impact.csv"
+CLEANED = "cleaned_nuked_player_injuries_impact"
+METRICS = "cleaned_with_metrics"
+SUMMARY = "player_injury_phase_summary"
+MATCHES = "injury_matches"
+COUNTS = "injury_counts.npz"
+MANIFEST_JSON = "pipeline_manifest.json"
+
+NA_TOKENS = ["N.A.", "N.A", "Missing"]
+
+# First number in a cell: "6.7", "6(S)" -> 6, "5..8" -> 5, "-2" -> -2
+NUMBER = r"(-?\d+\.?\d*)"
+
+result_map = {
+    "win": 3,
+    "draw": 1,
+    "lose": 0,
+    "Missing": None,
+    "N.A": None,
+    "N.A.": None
+}
+
+
+# ---------------------------------------------------------
+# Row fingerprints
+# ---------------------------------------------------------
+# An injury is identified by Name + Date of Injury + Season. The raw
+# file has exact repeats of that triple, so the occurrence number is
+# part of the key as well.
+KEY_COLS = ["Name", "Date of Injury", "Season"]
+
+
+def injury_keys(df):
+    key = df[KEY_COLS[0]].astype(str)
+    for col in KEY_COLS[1:]:
+        key = key + "|" + df[col].astype(str)
+    return key
+
+
+@instrument.profiled("pipeline.injury_ids")
+def injury_ids(df, seen=None):
+    # `seen` maps a key to how often it already occurred in earlier data
+    key = injury_keys(df)
+    occurrence = key.groupby(key).cumcount()
+    if seen is not None:
+        occurrence += key.map(seen).fillna(0).astype(int)
+    key = key + "|" + occurrence.astype(str)
+    hashed = pd.util.hash_array(key.to_numpy(dtype=object))
+    return pd.Series(hashed, index=df.index).map("{:016x}".format)
+
+
+# A row's fingerprint is the hash of its line in the raw file, so an
+# incremental run sees what changed without parsing anything.
+@instrument.profiled("pipeline.raw_lines")
+def raw_lines(path):
+    """(header, data lines) of a raw file as bytes; blank lines are skipped like read_csv does."""
+    with open(path, "rb") as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    return lines[0], lines[1:]
+
+
+def line_hashes(lines):
+    hashed = pd.util.hash_array(np.array(lines, dtype=object))
+    return pd.Series(hashed).map("{:016x}".format)
+
+
+# ---------------------------------------------------------
+# Reading and numeric coercion
+# ---------------------------------------------------------
+@instrument.profiled("pipeline.read_raw")
+def read_raw(path):
+    # The missing-value markers become NaN while the CSV is parsed, and
+    # repeated strings (teams, injuries, results, ...) are read as
+    # categoricals (see schema.py)
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, na_values=NA_TOKENS, dtype=schema.read_dtypes(header))
+
+
+def read_raw_lines(header, lines):
+    """Raw rows from some lines of a raw file (see raw_lines), parsed like read_raw."""
+    columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+    return pd.read_csv(io.BytesIO(b"\n".join([header, *lines])), na_values=NA_TOKENS,
+                       dtype=schema.read_dtypes(columns))
+
+
+def numeric_cols(df):
+    return [c for c in df.columns if schema.raw_field(c) in schema.COERCED_FIELDS]
+
+
+def parse_numbers(block):
+    """Float array of `block` plus a mask of the cells that needed the regex.
+
+    Plain numbers go through pd.to_numeric; only the cells it rejects
+    (e.g. "6(S)", "5..8") are run through the regex, all columns at once.
+    Cells where no number is found are NaN.
+    """
+    out = block.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float, copy=True)
+    text = block.notna().to_numpy() & np.isnan(out)
+    rows, col_idx = text.nonzero()
+    cells = pd.Series(block.to_numpy(dtype=object)[rows, col_idx], dtype=str)
+    out[rows, col_idx] = cells.str.extract(NUMBER)[0].astype(float).to_numpy()
+    return out, text
+
+
+@instrument.profiled("pipeline.coerce_numeric")
+def coerce_numeric(df, cols):
+    """Convert `cols` to float in one pass and report what had to be coerced.
+
+    The report has, per column, the cells that were missing, parsed
+    directly, coerced from text and dropped because no number was found.
+    """
+    out, text = parse_numbers(df[cols])
+    present = df[cols].notna().to_numpy()
+
+    df = df.copy()
+    df[cols] = out
+
+    coerced = (text & ~np.isnan(out)).sum(axis=0)
+    dropped = (text & np.isnan(out)).sum(axis=0)
+    report = pd.DataFrame({
+        "missing": (~present).sum(axis=0),
+        "parsed": present.sum(axis=0) - coerced - dropped,
+        "coerced": coerced,
+        "dropped": dropped,
+    }, index=pd.Index(cols, name="column"))
+    return df, report
+
+
+def print_coercion_report(report):
+    changed = report[(report["coerced"] > 0) | (report["dropped"] > 0)]
+    if changed.empty:
+        return
+    print(f"Numeric coercion: {int(changed['coerced'].sum())} cells coerced from text, "
+          f"{int(changed['dropped'].sum())} dropped")
+    print(changed.to_string())
+
+
+# ---------------------------------------------------------
+# Validation against the raw schema (see schema.py)
+# ---------------------------------------------------------
+# Rows with values the schema does not allow (text where a number
+# belongs, ratings outside 0-10, a return before the injury, ...) are
+# set aside with the reasons in QUARANTINE_CSV instead of becoming NaN
+# further down. When more than MAX_QUARANTINED of the rows fail, the
+# run stops before anything is computed or written.
+QUARANTINE_CSV = "quarantine.csv"
+MAX_QUARANTINED = 0.05
+
+
+@instrument.profiled("pipeline.validate")
+def validate(df):
+    """Split raw rows into (valid, quarantined).
+
+    Every check is one mask over a column or a block of match columns;
+    quarantined rows keep their raw values and get a "reason" column
+    listing every failed check.
+    """
+    missing = [col for col in schema.RAW_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Raw data is missing columns: {', '.join(missing)}")
+    data = df.replace(NA_TOKENS, pd.NA)
+    checks = {f"{col} is missing": data[col].isna().to_numpy() for col in schema.REQUIRED}
+
+    # Numbers: parsed like clean() does, then type and range
+    cols = [c for c in data.columns if schema.raw_kind(c) in ("number", "integer")]
+    values, _ = parse_numbers(data[cols])
+    present = data[cols].notna().to_numpy()
+    fields = [schema.raw_field(c) for c in cols]
+    low = np.array([schema.RANGES.get(f, (-np.inf, np.inf))[0] for f in fields])
+    high = np.array([schema.RANGES.get(f, (-np.inf, np.inf))[1] for f in fields])
+    integer = np.array([schema.raw_kind(c) == "integer" for c in cols])
+    with np.errstate(invalid="ignore"):
+        masks = {
+            "not a number": present & np.isnan(values),
+            "outside range": (values < low) | (values > high),
+            "not a whole number": integer & (values % 1 != 0) & ~np.isnan(values),
+        }
+    for problem, mask in masks.items():
+        for i, col in enumerate(cols):
+            if mask[:, i].any():
+                label = f"{col} outside {low[i]:g}-{high[i]:g}" if problem == "outside range" else f"{col} {problem}"
+                checks[label] = mask[:, i]
+
+    results = [c for c in data.columns if schema.raw_kind(c) == "result"]
+    unknown = (data[results].notna() & ~data[results].isin(schema.RESULTS)).to_numpy()
+    for i in unknown.any(axis=0).nonzero()[0]:
+        checks[f"{results[i]} not one of {'/'.join(schema.RESULTS)}"] = unknown[:, i]
+
+    season = data["Season"].astype(str).str.match(schema.SEASON_FORMAT)
+    checks["Season not like 2020/21"] = (data["Season"].notna() & ~season).to_numpy()
+
+    injured = schema.parse_dates(data["Date of Injury"])
+    returned = schema.parse_dates(data["Date of return"])
+    still_out = data["Date of return"].isin(schema.STILL_OUT)
+    checks["Date of Injury not a date"] = (data["Date of Injury"].notna() & injured.isna()).to_numpy()
+    checks["Date of return not a date"] = (data["Date of return"].notna() & returned.isna() & ~still_out).to_numpy()
+    checks["Date of return before Date of Injury"] = (returned < injured).to_numpy()
+
+    labels = np.array(list(checks))
+    rows, failed = np.column_stack(list(checks.values())).nonzero()
+    reasons = pd.Series(labels[failed]).groupby(rows).agg("; ".join)
+    bad = np.zeros(len(df), dtype=bool)
+    bad[reasons.index] = True
+
+    quarantined = df[bad].copy()
+    quarantined.insert(0, "reason", reasons.to_numpy())
+    return df[~bad], quarantined
+
+
+def too_many_invalid(quarantined, total, max_quarantined):
+    return max_quarantined is not None and len(quarantined) > max_quarantined * total
+
+
+def write_quarantine(quarantined, total, path=QUARANTINE_CSV, max_quarantined=MAX_QUARANTINED):
+    """Write the quarantine file (also when empty) and stop on a bad feed."""
+    if path:
+        quarantined.to_csv(path, index=False)
+    if len(quarantined):
+        print(f"Validation: {len(quarantined)} of {total} raw rows quarantined"
+              + (f" to '{path}'" if path else "") + ":")
+        print(quarantined["reason"].str.split("; ").explode().value_counts().to_string())
+    if too_many_invalid(quarantined, total, max_quarantined):
+        raise ValueError(f"{len(quarantined)} of {total} raw rows failed validation "
+                         f"(more than {max_quarantined:.1%}), nothing was written")
+
+
+def validate_raw(df, path=QUARANTINE_CSV, max_quarantined=MAX_QUARANTINED):
+    valid, quarantined = validate(df)
+    write_quarantine(quarantined, len(df), path, max_quarantined)
+    return valid
+
+
+# ---------------------------------------------------------
+# Dates: each distinct string parsed once (see schema.parse_dates)
+# ---------------------------------------------------------
+# Days_Out is Date of return - Date of Injury (missing while the player
+# is still out), Season_Week counts weeks from 1 August of the season's
+# first year; weeks outside 1-53 (a date that does not fall in its
+# season) are left missing.
+DATE_FEATURES = ["Days_Out", "Injury_Month", "Season_Week"]
+SEASON_START_MONTH = 8
+SEASON_WEEKS = 53
+
+
+def add_date_features(df):
+    injured = schema.parse_dates(df["Date of Injury"])
+    returned = schema.parse_dates(df["Date of return"])
+    start_year = pd.to_numeric(df["Season"].astype(str).str[:4], errors="coerce")
+    season_start = pd.to_datetime(
+        pd.DataFrame({"year": start_year, "month": SEASON_START_MONTH, "day": 1}), errors="coerce")
+
+    df = df.copy()
+    df["Date of Injury"] = injured
+    df["Date of return"] = returned
+    df["Days_Out"] = (returned - injured).dt.days
+    df["Injury_Month"] = injured.dt.month
+    week = (injured - season_start).dt.days // 7 + 1
+    df["Season_Week"] = week.where(week.between(1, SEASON_WEEKS))
+    return df
+
+
+# ---------------------------------------------------------
+# Stage 1: cleaning (was Data_preprocessing.py)
+# ---------------------------------------------------------
+@instrument.profiled("pipeline.clean")
+def clean(df, return_report=False, strategy=cleaning.DEFAULT):
+    if "injury_id" not in df.columns:
+        df = df.copy()
+        df.insert(0, "injury_id", injury_ids(df))
+
+    # 1. Convert "N.A." to actual missing values
+    df = df.replace(NA_TOKENS, pd.NA)
+
+    # 2. Unify player ratings, FIFA rating and goal differences to floats
+    df, report = coerce_numeric(df, numeric_cols(df))
+
+    # 3. Drop (or fill) rows with missing match data, by default only if
+    # ALL Match1 AND ALL Match2 values are missing (see cleaning.py)
+    df = cleaning.STRATEGIES[strategy](df)
+
+    # 4. Parse both dates and derive the recovery features
+    df = add_date_features(df)
+
+    if return_report:
+        return df, report
+    return df
+
+
+# ---------------------------------------------------------
+# Long match table: one row per injury, phase and match
+# ---------------------------------------------------------
+# The wide file has Match{N}_{phase}_{field} columns; any number of
+# matches per phase is picked up from the column names.
+PHASES = schema.PHASES
+MATCH_FIELDS = schema.MATCH_FIELDS
+MATCH_COL = schema.MATCH_COL
+LONG_COLS = ["injury_id", "phase", "match_index", "result", "opposition", "GD", "rating", "points"]
+
+
+def ids_of(df):
+    return df["injury_id"] if "injury_id" in df.columns else injury_ids(df)
+
+
+@instrument.profiled("pipeline.to_long")
+def to_long(df):
+    ids = ids_of(df)
+    blocks = []
+    for (phase, index), cols in schema.match_slots(df).items():
+        block = df[list(cols)].rename(columns=cols)
+        block.insert(0, "injury_id", ids)
+        block.insert(1, "phase", phase)
+        block.insert(2, "match_index", index)
+        blocks.append(block)
+
+    long = pd.concat(blocks, ignore_index=True).reindex(columns=LONG_COLS)
+    long = long.dropna(subset=["result", "opposition", "GD", "rating"], how="all")
+    long["phase"] = pd.Categorical(long["phase"], categories=PHASES)
+    long["points"] = long["result"].map(result_map).astype(float)
+    return long.reset_index(drop=True)
+
+
+# ---------------------------------------------------------
+# Stage 2: per-injury metrics (was Feture_engerning.py)
+# ---------------------------------------------------------
+METRIC_COLS = [
+    "Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury",
+    "Avg_GD_Before_Injury", "Avg_GD_Missed_Matches", "Team_Performance_Drop_Index",
+]
+
+
+@instrument.profiled("pipeline.add_metrics")
+def add_metrics(df, long=None):
+    if long is None:
+        long = to_long(df)
+
+    # Every phase average in one groupby, then one column per (field, phase)
+    # Loaded tables hold GDs as small nullable ints; averages are float
+    values = long[["GD", "rating"]].astype(float)
+    means = values.groupby([long["injury_id"], long["phase"]], observed=True).mean().unstack("phase")
+    means = means.reindex(index=ids_of(df), columns=pd.MultiIndex.from_product([["GD", "rating"], PHASES]))
+
+    df = df.copy()
+    df["Player_Avg_Rating_Before_Injury"] = means[("rating", "before_injury")].to_numpy()
+    df["Player_Avg_Rating_After_Injury"] = means[("rating", "after_injury")].to_numpy()
+
+    df["Avg_GD_Before_Injury"] = means[("GD", "before_injury")].to_numpy()
+    df["Avg_GD_Missed_Matches"] = means[("GD", "missed_match")].to_numpy()
+
+    # Performance Drop = Before - During
+    df["Team_Performance_Drop_Index"] = (
+        df["Avg_GD_Before_Injury"] - df["Avg_GD_Missed_Matches"]
+    )
+    return df
+
+
+# ---------------------------------------------------------
+# Stage 3: per-player phase summary (was Grouping.py)
+# ---------------------------------------------------------
+SUMMARY_SOURCES = {
+    "Player_Avg_Rating_Before_Injury": ("rating", "before_injury"),
+    "Team_Avg_GD_Before_Injury": ("GD", "before_injury"),
+    "Team_Avg_Result_Before_Injury": ("points", "before_injury"),
+    "Team_Avg_GD_Missed": ("GD", "missed_match"),
+    "Team_Avg_Result_Missed": ("points", "missed_match"),
+    "Player_Avg_Rating_After_Injury": ("rating", "after_injury"),
+    "Team_Avg_GD_After": ("GD", "after_injury"),
+    "Team_Avg_Result_After": ("points", "after_injury"),
+}
+
+
+STATE_FIELDS = ["GD", "rating", "points"]
+STATE_LEVELS = ["Name", "phase"]
+
+
+@instrument.profiled("pipeline.summary_state")
+def summary_state(df, long=None):
+    """Per player and phase sums and non-null counts of GD, rating and points.
+
+    Unlike means, these can be added up, so the states of separate chunks
+    are combined with merge_states before the means are taken.
+    """
+    if long is None:
+        long = to_long(df)
+
+    # Only matches of the injuries in df count, e.g. for a subset of players
+    names = pd.Series(df["Name"].to_numpy(), index=ids_of(df))
+    long = long.assign(Name=long["injury_id"].map(names))
+
+    # One pass for every phase and metric
+    phases = long[STATE_FIELDS].astype(float).groupby([long[level] for level in STATE_LEVELS], observed=True)
+    return pd.concat({"sum": phases.sum(), "count": phases.count()}, axis=1)
+
+
+@instrument.profiled("pipeline.merge_states")
+def merge_states(states):
+    return pd.concat(states).groupby(level=STATE_LEVELS, observed=True).sum()
+
+
+@instrument.profiled("pipeline.finalize_summary")
+def finalize_summary(state, names=None):
+    # Every match of a phase weighs the same, however many matches each
+    # injury has data for (not a mean of per-column means)
+    per_phase = (state["sum"] / state["count"]).unstack("phase")
+    if names is None:
+        names = per_phase.index
+    per_phase = per_phase.reindex(
+        index=pd.Index(names, name="Name").unique().sort_values(),
+        columns=pd.MultiIndex.from_product([STATE_FIELDS, PHASES]),
+    )
+
+    grouped = pd.DataFrame({out_col: per_phase[source] for out_col, source in SUMMARY_SOURCES.items()})
+
+    grouped["Player_Rating_Delta"] = (
+        grouped["Player_Avg_Rating_After_Injury"] -
+        grouped["Player_Avg_Rating_Before_Injury"]
+    )
+    grouped["Team_Performance_Drop"] = (
+        grouped["Team_Avg_GD_Before_Injury"] -
+        grouped["Team_Avg_GD_Missed"]
+    )
+    grouped["Team_Rebound_Index"] = (
+        grouped["Team_Avg_GD_After"] -
+        grouped["Team_Avg_GD_Missed"]
+    )
+    return grouped.reset_index()
+
+
+def phase_summary(df, long=None):
+    return finalize_summary(summary_state(df, long), df["Name"])
+
+
+# ---------------------------------------------------------
+# Full run: one read, in-memory stages, writes at the end
+# ---------------------------------------------------------
+@instrument.profiled("pipeline.write_outputs")
+def write_outputs(detailed, summary, long, metrics_path=METRICS, summary_path=SUMMARY, matches_path=MATCHES,
+                  counts_path=COUNTS, db_path=injury_db.DB_FILE, similarity_path=similarity.INDEX_FILE,
+                  fmt="parquet"):
+    """The three tables and every store derived from them, written from scratch."""
+    storage.write_table(long, matches_path, fmt)
+    storage.write_table(detailed, metrics_path, fmt)
+    storage.write_table(summary, summary_path, fmt)
+    injury_counts.write(detailed, counts_path)
+    injury_db.write(detailed, long, summary, db_path)
+    similarity.write(detailed, long, similarity_path)
+
+
+@instrument.profiled("pipeline.run")
+def run(raw_path=RAW_CSV, metrics_path=METRICS, summary_path=SUMMARY,
+        manifest_path=MANIFEST_JSON, fmt="parquet", cleaned_path=None, matches_path=MATCHES,
+        counts_path=COUNTS, quarantine_path=QUARANTINE_CSV, max_quarantined=MAX_QUARANTINED,
+        db_path=injury_db.DB_FILE, similarity_path=similarity.INDEX_FILE):
+    df = read_raw(raw_path)
+    df.insert(0, "injury_id", injury_ids(df))
+    ids = df["injury_id"]
+    df = validate_raw(df, quarantine_path, max_quarantined)
+    cleaned, report = clean(df, return_report=True)
+    print_coercion_report(report)
+    long = to_long(cleaned)
+    detailed = add_metrics(cleaned, long)
+    summary = phase_summary(detailed, long)
+    detailed, summary, long = opposition.apply(detailed, summary, long)
+
+    if cleaned_path:
+        storage.write_table(cleaned, cleaned_path, fmt)
+    write_outputs(detailed, summary, long, metrics_path, summary_path, matches_path,
+                  counts_path, db_path, similarity_path, fmt)
+    save_manifest(manifest_path, raw_lines(raw_path), ids, df["injury_id"])
+    return detailed, summary
+
+
+# ---------------------------------------------------------
+# Incremental run: only new or changed raw rows are recomputed
+# ---------------------------------------------------------
+def load_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path, lines, ids, kept):
+    """Fingerprints of the header and of the `kept` rows; `ids` are those of all lines."""
+    header, rows = lines
+    if len(rows) != len(ids):
+        # A quoted cell spans lines, so lines cannot be told apart by
+        # row; without a manifest the next incremental run is a full one
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    hashes = line_hashes(rows).set_axis(np.asarray(ids))
+    manifest = {"header": line_hashes([header])[0], "rows": hashes[hashes.index.isin(kept)].to_dict()}
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+
+@instrument.profiled("pipeline.run_incremental")
+def run_incremental(raw_path=RAW_CSV, metrics_path=METRICS, summary_path=SUMMARY,
+                    manifest_path=MANIFEST_JSON, fmt="parquet", cleaned_path=None, matches_path=MATCHES,
+                    counts_path=COUNTS, quarantine_path=QUARANTINE_CSV, max_quarantined=MAX_QUARANTINED,
+                    db_path=injury_db.DB_FILE, similarity_path=similarity.INDEX_FILE):
+    full_run = (raw_path, metrics_path, summary_path, manifest_path, fmt, cleaned_path, matches_path, counts_path,
+                quarantine_path, max_quarantined, db_path, similarity_path)
+    metrics_file = storage.table_path(metrics_path, fmt)
+    summary_file = storage.table_path(summary_path, fmt)
+    matches_file = storage.table_path(matches_path, fmt)
+
+    manifest = load_manifest(manifest_path)
+    outputs = [metrics_file, summary_file, matches_file, counts_path, db_path, similarity_path]
+    if manifest is None or not all(os.path.exists(path) for path in outputs):
+        print("No previous build found, running the full pipeline.")
+        return run(*full_run)
+
+    # Rows are matched by line, so a new header needs a full run too
+    header, lines = raw_lines(raw_path)
+    keys = pd.read_csv(raw_path, usecols=KEY_COLS, na_values=NA_TOKENS)
+    old_detailed = storage.read_table(metrics_file)
+    if ("injury_id" not in old_detailed.columns or cleaned_path or len(keys) != len(lines)
+            or manifest.get("header") != line_hashes([header])[0]):
+        print("Previous build cannot be updated in place, running the full pipeline.")
+        return run(*full_run)
+
+    # Unchanged lines passed validation when they were fingerprinted; only
+    # the others are parsed and validated. Quarantined rows are not in the
+    # manifest, so they count as removed, and as new once they are fixed.
+    ids = injury_ids(keys)
+    seen = pd.Series(manifest["rows"], dtype=object)
+    unchanged = (ids.map(seen) == line_hashes(lines)).to_numpy()
+    fresh = read_raw_lines(header, np.array(lines, dtype=object)[~unchanged])
+    fresh.insert(0, "injury_id", ids[~unchanged].to_numpy())
+    fresh, quarantined = validate(fresh)
+    write_quarantine(quarantined, len(ids), quarantine_path, max_quarantined)
+    valid_ids = pd.Index(ids[unchanged]).append(pd.Index(fresh["injury_id"]))
+    removed = seen.index.difference(valid_ids)
+
+    if fresh.empty and removed.empty:
+        print("Outputs are up to date.")
+        return old_detailed, storage.read_table(summary_file)
+
+    old_summary = storage.read_table(summary_file)
+    old_long = storage.read_table(matches_file)
+    stale_ids = removed.union(fresh["injury_id"])
+    stale = old_detailed["injury_id"].isin(stale_ids)
+    fresh_cleaned, report = clean(fresh, return_report=True)
+    print_coercion_report(report)
+    fresh_long = to_long(fresh_cleaned)
+    fresh = add_metrics(fresh_cleaned, fresh_long)
+    long = pd.concat([old_long[~old_long["injury_id"].isin(stale_ids)], fresh_long], ignore_index=True)
+
+    # Keep the raw file's row order in the detailed table
+    detailed = pd.concat([old_detailed[~stale], fresh], ignore_index=True)
+    position = pd.Series(range(len(ids)), index=ids.to_numpy())
+    detailed = detailed.iloc[position[detailed["injury_id"]].to_numpy().argsort()].reset_index(drop=True)
+
+    # Only players touched by the changed rows need their summary rebuilt
+    affected = pd.concat([old_detailed.loc[stale, "Name"], fresh["Name"]]).unique()
+    touched = detailed[detailed["Name"].isin(affected)]
+    summary = pd.concat([
+        old_summary[~old_summary["Name"].isin(affected)],
+        phase_summary(touched, long[long["injury_id"].isin(touched["injury_id"])]),
+    ]).sort_values("Name").reset_index(drop=True)
+    # Opponent strengths depend on every match, so all adjusted columns are redone
+    detailed, summary, long = opposition.apply(detailed, summary, long)
+
+    storage.write_table(long, matches_file)
+    storage.write_table(detailed, metrics_file)
+    storage.write_table(summary, summary_file)
+    injury_counts.write(detailed, counts_path)
+    injury_db.update(detailed, long, summary, stale_ids, db_path)
+    similarity.update(detailed, long, stale_ids, similarity_path)
+    save_manifest(manifest_path, (header, lines), ids, valid_ids)
+    print(f"Incremental update: {len(stale_ids) - len(removed)} new/changed rows, {len(removed)} removed, "
+          f"{len(affected)} players re-aggregated.")
+    return detailed, summary
+
+
+# ---------------------------------------------------------
+# Parallel run: a directory of raw files (e.g. one per season
+# or league) or one file in chunks, processed in a process pool
+# ---------------------------------------------------------
+def raw_files(path):
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.csv")))
+    return [path]
+
+
+@instrument.profiled("pipeline.process_chunk")
+def process_chunk(source, ids, max_quarantined=None):
+    # Runs in a worker: validate, clean, long table, metrics and summary
+    # state of one chunk. A chunk with too many invalid rows is not
+    # processed further (the run is stopped once all chunks are back).
+    df = read_raw(source) if isinstance(source, str) else source
+    df.insert(0, "injury_id", ids)
+    total = len(df)
+    df, quarantined = validate(df)
+    if too_many_invalid(quarantined, total, max_quarantined):
+        return None, None, None, None, quarantined
+    cleaned, report = clean(df, return_report=True)
+    long = to_long(cleaned)
+    detailed = add_metrics(cleaned, long)
+    return detailed, long, summary_state(detailed, long), report, quarantined
+
+
+@instrument.profiled("pipeline.run_parallel")
+def run_parallel(raw_path=RAW_CSV, metrics_path=METRICS, summary_path=SUMMARY,
+                 manifest_path=MANIFEST_JSON, fmt="parquet", cleaned_path=None, matches_path=MATCHES,
+                 counts_path=COUNTS, quarantine_path=QUARANTINE_CSV, max_quarantined=MAX_QUARANTINED,
+                 db_path=injury_db.DB_FILE, similarity_path=similarity.INDEX_FILE, workers=None, chunksize=None):
+    files = raw_files(raw_path)
+
+    # Injury ids are numbered over all inputs, so repeats of the same
+    # Name + Date + Season in different files/chunks still get unique ids.
+    keys = [pd.read_csv(f, usecols=KEY_COLS, na_values=NA_TOKENS) for f in files]
+    ids = injury_ids(pd.concat(keys, ignore_index=True)).to_numpy()
+
+    def tasks():
+        start = 0
+        for f, key in zip(files, keys):
+            if chunksize:
+                # Same dtypes as read_raw, so chunks match a whole-file read
+                header = pd.read_csv(f, nrows=0).columns
+                for chunk in pd.read_csv(f, chunksize=chunksize, na_values=NA_TOKENS,
+                                         dtype=schema.read_dtypes(header)):
+                    yield chunk, ids[start:start + len(chunk)]
+                    start += len(chunk)
+            else:
+                yield f, ids[start:start + len(key)]
+                start += len(key)
+
+    if workers == 1:
+        results = [process_chunk(*task, max_quarantined) for task in tasks()]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_chunk, *task, max_quarantined) for task in tasks()]
+            results = [future.result() for future in futures]
+
+    detailed, long, states, reports, quarantined = zip(*results)
+    quarantined = pd.concat(quarantined, ignore_index=True)
+    if any(part is None for part in detailed):
+        write_quarantine(quarantined, len(ids), quarantine_path, None)
+        raise ValueError(f"A chunk had more than {max_quarantined:.1%} invalid rows, nothing was written")
+    write_quarantine(quarantined, len(ids), quarantine_path, max_quarantined)
+    detailed = pd.concat(detailed, ignore_index=True)
+    long = pd.concat(long, ignore_index=True)
+    long["phase"] = pd.Categorical(long["phase"], categories=PHASES)
+    summary = finalize_summary(merge_states(states), detailed["Name"])
+    detailed, summary, long = opposition.apply(detailed, summary, long)
+    print_coercion_report(pd.concat(reports).groupby(level=0, sort=False).sum())
+
+    if cleaned_path:
+        storage.write_table(detailed.drop(columns=METRIC_COLS + opposition.INJURY_COLS), cleaned_path, fmt)
+    write_outputs(detailed, summary, long, metrics_path, summary_path, matches_path,
+                  counts_path, db_path, similarity_path, fmt)
+    lines = [raw_lines(f) for f in files]
+    save_manifest(manifest_path, (lines[0][0], [row for _, rows in lines for row in rows]),
+                  ids, pd.Index(ids).difference(quarantined["injury_id"]))
+    print(f"Processed {len(results)} chunk(s) from {len(files)} file(s).")
+    return detailed, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the SportHurt injury pipeline (clean -> metrics -> phase summary).")
+    parser.add_argument("--input", default=RAW_CSV,
+                        help="raw injury CSV, or a directory of them (e.g. one per season/league)")
+    parser.add_argument("--metrics-out", default=METRICS, help="per-injury metrics table")
+    parser.add_argument("--summary-out", default=SUMMARY, help="per-player phase summary table")
+    parser.add_argument("--cleaned-out", default=None,
+                        help=f"also write the cleaned table (e.g. {CLEANED})")
+    parser.add_argument("--matches-out", default=MATCHES,
+                        help="long match table (injury_id, phase, match_index, result, opposition, GD, rating)")
+    parser.add_argument("--counts-out", default=COUNTS,
+                        help="injury count cube (team x season x month x injury x position, .npz)")
+    parser.add_argument("--quarantine-out", default=QUARANTINE_CSV,
+                        help="CSV of the raw rows that failed validation, with the reasons")
+    parser.add_argument("--max-quarantined", type=float, default=MAX_QUARANTINED, metavar="FRACTION",
+                        help="stop before writing anything when more than this fraction of raw rows "
+                             "fails validation (default: %(default)s; 1 never stops)")
+    parser.add_argument("--db-out", default=injury_db.DB_FILE,
+                        help="SQLite database of the detailed, match and summary tables (see injury_db.py)")
+    parser.add_argument("--similarity-out", default=similarity.INDEX_FILE,
+                        help="nearest-neighbour index of recovery trajectories (see similarity.py)")
+    parser.add_argument("--format", choices=list(storage.FORMATS), default="parquet",
+                        help="output format; csv is kept for export")
+    parser.add_argument("--manifest", default=MANIFEST_JSON, help="fingerprints of already processed raw rows")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only recompute rows that are new or changed since the last run")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for directory/chunked input (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="split each raw file into chunks of this many rows and process them in parallel")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="print the memory of the output tables with default and compact dtypes")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"log per-stage timings and memory as JSON lines (same as {instrument.ENV_VAR}=1)")
+    args = parser.parse_args(argv)
+    if args.profile:
+        instrument.enable()
+
+    outputs = (args.input, args.metrics_out, args.summary_out, args.manifest,
+               args.format, args.cleaned_out, args.matches_out, args.counts_out,
+               args.quarantine_out, args.max_quarantined, args.db_out, args.similarity_out)
+    if (os.path.isdir(args.input) or args.chunksize) and args.incremental:
+        parser.error("--incremental works on a single raw file without --chunksize")
+    try:
+        if os.path.isdir(args.input) or args.chunksize:
+            detailed, summary = run_parallel(*outputs, workers=args.workers, chunksize=args.chunksize)
+        elif args.incremental:
+            detailed, summary = run_incremental(*outputs)
+        else:
+            detailed, summary = run(*outputs)
+    except ValueError as e:
+        parser.exit(1, f"Pipeline stopped: {e}\n")
+    print(f"Pipeline finished: {len(detailed)} injuries, {len(summary)} players.")
+
+    if args.memory_report:
+        long = storage.read_table(storage.table_path(args.matches_out, args.format))
+        print("\nMemory (MB) with default dtypes -> schema dtypes:")
+        print(schema.memory_report({"metrics": detailed, "summary": summary, "matches": long}).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Column dtypes shared by every loader and writer
+# ---------------------------------------------------------
+# Repeated strings are categoricals, goal differences, points and ages
+# small (nullable) ints, player ratings float32 and dates datetimes.
+# Columns are matched by name, or by suffix for the wide per-match
+# columns (Match1_before_injury_GD, ..._Opposition, ...).
+CATEGORY_COLS = ["Name", "Team Name", "Position", "Injury", "Season", "phase", "result", "opposition"]
+CATEGORY_SUFFIXES = ("_Result", "_Opposition")
+FLOAT32_COLS = ["FIFA rating", "rating", "adj_GD", "adj_points"]
+FLOAT32_SUFFIXES = ("_Player_rating",)
+SMALL_INT_COLS = {"GD": "Int8", "points": "Int8", "Age": "Int8", "match_index": "Int8",
+                  "Days_Out": "Int16", "Injury_Month": "Int8", "Season_Week": "Int8"}
+SMALL_INT_SUFFIXES = {"_GD": "Int8"}
+DATE_COLS = ["Date of Injury", "Date of return"]
+
+
+def dtype_of(col):
+    if col in CATEGORY_COLS or col.endswith(CATEGORY_SUFFIXES):
+        return "category"
+    if col in FLOAT32_COLS or col.endswith(FLOAT32_SUFFIXES):
+        return "float32"
+    if col in SMALL_INT_COLS:
+        return SMALL_INT_COLS[col]
+    for suffix, dtype in SMALL_INT_SUFFIXES.items():
+        if col.endswith(suffix):
+            return dtype
+    if col in DATE_COLS:
+        return "datetime"
+    return None
+
+
+def read_dtypes(columns):
+    """dtype= argument for pd.read_csv: the categoricals, parsed while reading."""
+    return {col: "category" for col in columns if dtype_of(col) == "category"}
+
+
+def to_small_int(values, dtype):
+    # Only whole numbers that fit are stored as ints; anything else (a
+    # fractional GD from a bad feed) keeps its value as float32
+    values = pd.to_numeric(values, errors="coerce")
+    info = np.iinfo(dtype.lower())
+    present = values.dropna()
+    if ((present % 1 == 0) & present.between(info.min, info.max)).all():
+        return values.astype(dtype)
+    return values.astype("float32")
+
+
+def apply(df):
+    df = df.copy()
+    for col in df.columns:
+        dtype = dtype_of(col)
+        if dtype == "category":
+            # Mostly-unique columns (e.g. Name in the per-player summary)
+            # are smaller as plain strings
+            if df[col].nunique() <= len(df) // 2:
+                df[col] = df[col].astype("category")
+            elif isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(df[col].cat.categories.dtype)
+        elif dtype is None or str(df[col].dtype) == dtype:
+            continue
+        elif dtype == "float32":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+        elif dtype == "datetime":
+            df[col] = parse_dates(df[col])
+        else:
+            df[col] = to_small_int(df[col], dtype)
+    if "injury_id" in df.columns:
+        df["injury_id"] = df["injury_id"].astype(str)
+    return df
+
+
+def defaults(df):
+    """`df` with the dtypes pandas picks by itself (strings, int64/float64)."""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+        elif str(df[col].dtype) in ("float32", "Int8", "Int16", "Int32"):
+            df[col] = df[col].astype("float64")
+    return df
+
+
+def memory_report(tables):
+    """Deep memory use of each {name: DataFrame} with default and schema dtypes."""
+    rows = []
+    for name, df in tables.items():
+        before = defaults(df).memory_usage(deep=True).sum()
+        after = apply(df).memory_usage(deep=True).sum()
+        rows.append({"table": name, "rows": len(df), "before_mb": before / 2**20,
+                     "after_mb": after / 2**20, "saved_%": 100 * (1 - after / before)})
+    report = pd.DataFrame(rows).set_index("table")
+    report.loc["total"] = report.sum()
+    report.loc["total", "saved_%"] = 100 * (1 - report.loc["total", "after_mb"] / report.loc["total", "before_mb"])
+    report["rows"] = report["rows"].astype(int)
+    return report.round(2)
+
+
+# ---------------------------------------------------------
+# Raw file schema, checked by pipeline.validate
+# ---------------------------------------------------------
+# Every column of the raw injury file with its kind, declared once
+# instead of being guessed from substrings of the names. The wide
+# per-match columns are Match{N}_{phase}_{field}, any N.
+PHASES = ["before_injury", "missed_match", "after_injury"]
+MATCH_FIELDS = {"Result": "result", "Opposition": "opposition", "GD": "GD", "Player_rating": "rating"}
+MATCH_COL = re.compile(r"^Match(\d+)_(%s)_(%s)$" % ("|".join(PHASES), "|".join(MATCH_FIELDS)))
+
+RAW_COLUMNS = {
+    "Name": "text", "Team Name": "text", "Position": "text", "Age": "integer", "Season": "season",
+    "FIFA rating": "number", "Injury": "text", "Date of Injury": "date", "Date of return": "date",
+}
+RAW_MATCH_KINDS = {"Result": "result", "Opposition": "text", "GD": "integer", "Player_rating": "number"}
+# Position is needed by the count cube, the dashboard filters and the
+# similarity index, so rows without one are quarantined too
+REQUIRED = ["Name", "Team Name", "Position", "Season", "Injury", "Date of Injury"]
+
+# Fields whose cells may hold text around the number ("6(S)", "5..8"),
+# parsed by pipeline.coerce_numeric
+COERCED_FIELDS = ["FIFA rating", "GD", "Player_rating"]
+RANGES = {"Age": (15, 45), "FIFA rating": (1, 99), "GD": (-15, 15), "Player_rating": (0, 10)}
+RESULTS = ["win", "draw", "lose"]
+SEASON_FORMAT = r"^\d{4}/\d{2}$"
+# "Feb 18, 2021", "Dec 9,2022", "July 9, 2023", and ISO dates from
+# exported pipeline tables
+DATE_FORMATS = ["%b %d, %Y", "%B %d, %Y", "%Y-%m-%d"]
+# Dates outside these years are typos ("Mar 7, 0202") and read as NaT;
+# datetime64[ns] could not hold most of them anyway
+DATE_YEARS = (1900, 2100)
+# Date of return of an injury that is not over yet
+STILL_OUT = ["Present"]
+
+
+def raw_field(col):
+    """Schema entry of a raw column: its own name, or the field of a match column."""
+    if col in RAW_COLUMNS:
+        return col
+    m = MATCH_COL.match(col)
+    return m.group(3) if m else None
+
+
+def raw_kind(col):
+    field = raw_field(col)
+    return RAW_COLUMNS.get(field) or RAW_MATCH_KINDS.get(field)
+
+
+def match_slots(df):
+    """{(phase, match number): {column: long table field}} of the match columns of `df`."""
+    slots = {}
+    for col in df.columns:
+        m = MATCH_COL.match(col)
+        if m:
+            slots.setdefault((m.group(2), int(m.group(1))), {})[col] = MATCH_FIELDS[m.group(3)]
+    return slots
+
+
+# Distinct date strings seen by parse_dates -> datetime64[ns]
+_parsed_dates = {}
+
+
+def parse_dates(values):
+    """Dates in one of DATE_FORMATS as datetime64; anything else is NaT.
+
+    Every distinct string is parsed once per process (a file has a few
+    hundred distinct dates however many rows, and validate and clean
+    see the same ones), with explicit formats rather than per-element
+    inference.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    new = [u for u in uniques if u not in _parsed_dates]
+    if new:
+        text = pd.Series(new, dtype=object).astype(str).str.strip().str.replace(r",\s*", ", ", regex=True)
+        dates = pd.to_datetime(text, format=DATE_FORMATS[0], errors="coerce")
+        for fmt in DATE_FORMATS[1:]:
+            todo = dates.isna()
+            if todo.any():
+                dates[todo] = pd.to_datetime(text[todo], format=fmt, errors="coerce")
+        # Out-of-range years become NaT before the cast to nanoseconds,
+        # which would wrap them around to some other year
+        dates = dates.where(dates.dt.year.between(*DATE_YEARS))
+        _parsed_dates.update(zip(new, dates.to_numpy(dtype="datetime64[ns]")))
+    # code -1 (missing) picks the NaT appended at the end
+    lookup = np.array([_parsed_dates[u] for u in uniques] + [np.datetime64("NaT", "ns")], dtype="datetime64[ns]")
+    return pd.Series(lookup[codes], index=values.index, name=values.name)
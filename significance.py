@@ -0,0 +1,178 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import instrument
+import pipeline
+import storage
+
+# ---------------------------------------------------------
+# Bootstrap intervals and permutation p-values per group
+# ---------------------------------------------------------
+# Many injury types, positions and clubs have only a few injuries, so
+# their mean drop is mostly noise. For every group of DIMENSIONS and
+# every metric this computes the mean, a bootstrap confidence interval
+# and a permutation p-value against the overall mean.
+#
+# Rows are sorted by group, so each resample of every group at once is
+# one index matrix (resamples x rows) into the values and the group
+# means are one np.add.reduceat over it. Resamples are drawn in blocks
+# of at most BLOCK_CELLS cells to bound memory. Results are saved to
+# STATS_FILE with the fingerprint of the pipeline tables (see
+# analytics.py) and the settings, and recomputed only when they change.
+STATS_FILE = "significance.pkl"
+DIMENSIONS = ["Injury", "Position", "Age_Group", "Team Name"]
+METRICS = ["Team_Performance_Drop_Index", "Adj_Team_Performance_Drop_Index", "Player_Rating_Delta"]
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+ALPHA = 0.05
+SEED = 0
+BLOCK_CELLS = 2_000_000
+STAT_COLS = ["n", "mean", "ci_low", "ci_high", "p_value"]
+
+INPUT_COLS = ["Injury", "Position", "Age", "Team Name", "Team_Performance_Drop_Index",
+              "Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury"]
+
+
+@instrument.profiled("significance.load_inputs")
+def load_inputs(metrics=pipeline.METRICS):
+    available = storage.table_columns(storage.find_table(metrics))
+    columns = INPUT_COLS + [c for c in analytics.OPTIONAL_COLS if c in available]
+    df = storage.load_table(metrics, columns=columns).reindex(columns=INPUT_COLS + analytics.OPTIONAL_COLS)
+
+    df["Player_Rating_Delta"] = (df["Player_Avg_Rating_After_Injury"].astype(float)
+                                 - df["Player_Avg_Rating_Before_Injury"].astype(float))
+    df["Age_Group"] = pd.cut(df["Age"].astype(float), bins=analytics.AGE_BINS, labels=analytics.AGE_LABELS)
+    return df
+
+
+def blocks(resamples, cells_per_resample):
+    size = max(1, BLOCK_CELLS // max(cells_per_resample, 1))
+    for start in range(0, resamples, size):
+        yield min(size, resamples - start)
+
+
+class Groups:
+    """Rows of one dimension sorted by group, for np.add.reduceat."""
+
+    def __init__(self, labels):
+        # Missing labels form a group of their own (so every dimension
+        # uses the same rows) that is left out of the results
+        codes, uniques = pd.factorize(labels, sort=True, use_na_sentinel=False)
+        self.order = np.argsort(codes, kind="stable")
+        self.sizes = np.bincount(codes)
+        self.starts = np.cumsum(self.sizes) - self.sizes
+        self.labels = pd.Index(uniques)
+
+    def means(self, values):
+        # values: (resamples, rows) in this dimension's sorted row order
+        return np.add.reduceat(values, self.starts, axis=-1) / self.sizes
+
+
+def metric_stats(values, labels, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """{dimension: n, mean, ci_low, ci_high and p_value per group} for one metric.
+
+    `labels` maps each dimension to the group label of every value.
+    """
+    keep = ~np.isnan(values)
+    values = values[keep]
+    groups = {dimension: Groups(np.asarray(dim_labels, dtype=object)[keep]) for dimension, dim_labels in labels.items()}
+    rng = np.random.default_rng(seed)
+    tables = {}
+    if len(values) == 0:
+        return {dimension: pd.DataFrame(columns=STAT_COLS, dtype=float) for dimension in labels}
+    overall = values.mean()
+
+    # Permutation: group labels shuffled over all rows; the same
+    # shuffles serve every dimension
+    observed, extreme = {}, {}
+    for dimension, g in groups.items():
+        observed[dimension] = g.means(values[g.order])
+        extreme[dimension] = np.zeros(len(g.sizes))
+    for n in blocks(resamples, len(values)):
+        shuffled = values[rng.permuted(np.tile(np.arange(len(values)), (n, 1)), axis=1)]
+        for dimension, g in groups.items():
+            permuted = g.means(shuffled[:, g.order])
+            extreme[dimension] += (np.abs(permuted - overall) >= np.abs(observed[dimension] - overall) - 1e-12).sum(axis=0)
+
+    tail = (1 - confidence) / 2
+    for dimension, g in groups.items():
+        # Bootstrap: row j of a resample is a random row of its own group
+        sorted_values = values[g.order]
+        row_start = np.repeat(g.starts, g.sizes)
+        row_size = np.repeat(g.sizes, g.sizes)
+        means = []
+        for n in blocks(resamples, len(values)):
+            index = row_start + (rng.random((n, len(values)), dtype=np.float32) * row_size).astype(np.int64)
+            means.append(g.means(sorted_values[np.minimum(index, row_start + row_size - 1)]))
+        ci_low, ci_high = np.quantile(np.vstack(means), [tail, 1 - tail], axis=0)
+
+        table = pd.DataFrame({
+            "n": g.sizes, "mean": observed[dimension], "ci_low": ci_low, "ci_high": ci_high,
+            "p_value": (extreme[dimension] + 1) / (resamples + 1),
+        }, index=g.labels)
+        tables[dimension] = table[table.index.notna()]
+    return tables
+
+
+@instrument.profiled("significance.build_stats")
+def build_stats(df, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """{dimension: DataFrame with (metric, n/mean/ci_low/ci_high/p_value) columns}."""
+    labels = {dimension: df[dimension].astype(object).where(df[dimension].notna()).to_numpy()
+              for dimension in DIMENSIONS}
+    per_metric = {metric: metric_stats(df[metric].to_numpy(dtype=float), labels, resamples, confidence, seed)
+                  for metric in METRICS}
+    return {dimension: pd.concat({metric: per_metric[metric][dimension] for metric in METRICS}, axis=1)
+            .rename_axis(dimension) for dimension in DIMENSIONS}
+
+
+def significant(table, metric, alpha=ALPHA):
+    """Groups of `table` whose mean `metric` differs from the overall mean at level `alpha`."""
+    stats = table[metric]
+    return stats.index[(stats["n"] >= 2) & (stats["p_value"] < alpha)]
+
+
+def load_stats(metrics=pipeline.METRICS, summary=pipeline.SUMMARY, path=STATS_FILE,
+               resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED, rebuild=False):
+    key = f"{analytics.fingerprint(metrics, summary)}|{resamples}|{confidence}|{seed}"
+    if not rebuild and os.path.exists(path):
+        cached = pd.read_pickle(path)
+        if cached.get("fingerprint") == key:
+            return cached["tables"]
+
+    tables = build_stats(load_inputs(metrics), resamples, confidence, seed)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle({"fingerprint": key, "tables": tables}, tmp)
+    os.replace(tmp, path)
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap intervals and permutation p-values per group.")
+    parser.add_argument("--metrics", default=pipeline.METRICS, help="per-injury metrics table")
+    parser.add_argument("--summary", default=pipeline.SUMMARY, help="per-player phase summary table")
+    parser.add_argument("--output", default=STATS_FILE)
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="p-value below which a group is shown")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--metric", choices=METRICS, default=METRICS[0])
+    parser.add_argument("--rebuild", action="store_true", help="recompute even if the inputs did not change")
+    args = parser.parse_args(argv)
+
+    tables = load_stats(args.metrics, args.summary, args.output, args.resamples, args.confidence,
+                        args.seed, args.rebuild)
+    for dimension, table in tables.items():
+        chosen = significant(table, args.metric, args.alpha)
+        print(f"\n{dimension}: {len(chosen)} of {len(table)} groups with p < {args.alpha} ({args.metric})")
+        if len(chosen):
+            stats = table.loc[chosen, args.metric].astype({"n": int})
+            print(stats.sort_values("mean", ascending=False).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
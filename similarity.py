@@ -0,0 +1,181 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import schema
+
+# ---------------------------------------------------------
+# Recovery-trajectory similarity: "players who recovered like this one"
+# ---------------------------------------------------------
+# Every injury becomes one fixed-length vector: the rating, GD and
+# points of the first SLOTS matches of each phase (no rating while the
+# player is out), plus age, FIFA rating and position (one-hot). Numbers
+# are z-scored over all injuries and a missing value becomes 0, the
+# average. The pipeline writes the vectors with their squared norms and
+# a few labels to INDEX_FILE; incremental runs only swap the vectors of
+# the changed injuries (merge()).
+#
+# A query is one matrix-vector product over all vectors
+# (|x - q|^2 = |x|^2 - 2 x.q + |q|^2) and an argpartition for the k
+# smallest, so it stays in the milliseconds for hundreds of thousands
+# of injuries without a tree structure.
+INDEX_FILE = "similarity_index.npz"
+SLOTS = 3
+PHASE_FIELDS = {
+    "before_injury": ["rating", "GD", "points"],
+    "missed_match": ["GD", "points"],
+    "after_injury": ["rating", "GD", "points"],
+}
+PROFILE_COLS = ["Age", "FIFA rating"]
+POSITION_WEIGHT = 1.0
+K = 5
+LABEL_COLS = ["injury_id", "Name", "Team Name", "Season", "Injury", "Date of Injury"]
+DISPLAY_COLS = ["Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury", "Team_Performance_Drop_Index"]
+INDEX_KEYS = ["vectors", "norms", "features", "mean", "scale", "player"] + LABEL_COLS + DISPLAY_COLS
+
+
+def trajectory_columns():
+    return [f"{phase}_{slot}_{field}" for phase, fields in PHASE_FIELDS.items()
+            for slot in range(1, SLOTS + 1) for field in fields]
+
+
+def features(detailed, long):
+    """One row per injury of `detailed`: match slots, profile and position columns."""
+    long = long[long["match_index"].astype(float) <= SLOTS]
+    fields = sorted({field for fields in PHASE_FIELDS.values() for field in fields})
+    wide = long.pivot_table(index="injury_id", columns=["phase", "match_index"], values=fields,
+                            aggfunc="mean", observed=True)
+    wide.columns = [f"{phase}_{slot}_{field}" for field, phase, slot in wide.columns]
+    wide = wide.reindex(index=detailed["injury_id"], columns=trajectory_columns())
+
+    profile = detailed[PROFILE_COLS].astype(float).set_axis(wide.index)
+    positions = detailed["Position"].astype(object).where(detailed["Position"].notna()).str.strip()
+    one_hot = pd.get_dummies(positions, prefix="Position", dtype=float).set_axis(wide.index)
+    return pd.concat([wide.astype(float), profile], axis=1), one_hot
+
+
+def rows(detailed, numbers, one_hot, mean, scale):
+    """Vectors, norms and labels of the injuries in `detailed`, scaled with `mean` and `scale`."""
+    z = np.nan_to_num((numbers.to_numpy() - mean) / scale)
+    vectors = np.hstack([z, one_hot.to_numpy() * POSITION_WEIGHT]).astype(np.float32)
+    index = {"vectors": vectors, "norms": (vectors.astype(np.float64) ** 2).sum(axis=1)}
+    dates = detailed["Date of Injury"]
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        dates = dates.dt.strftime("%Y-%m-%d")
+    labels = detailed[LABEL_COLS].assign(**{"Date of Injury": dates})
+    for col in LABEL_COLS:
+        text = labels[col].astype(object).where(labels[col].notna(), "").astype(str).str.strip()
+        index[col] = np.asarray(text, dtype=str)
+    for col in DISPLAY_COLS:
+        index[col] = detailed[col].to_numpy(dtype=float)
+    return index
+
+
+def players(names):
+    # Integer player codes: comparing them is ~10x faster than names
+    return pd.factorize(names)[0].astype(np.int32)
+
+
+@instrument.profiled("similarity.build")
+def build(detailed, long):
+    numbers, one_hot = features(detailed, long)
+    mean = numbers.mean().fillna(0).to_numpy()
+    scale = numbers.std().where(lambda std: std > 0, 1).to_numpy()
+    index = rows(detailed, numbers, one_hot, mean, scale)
+    index["features"] = np.asarray(list(numbers.columns) + list(one_hot.columns), dtype=str)
+    index["mean"], index["scale"] = mean, scale
+    index["player"] = players(index["Name"])
+    return index
+
+
+@instrument.profiled("similarity.merge")
+def merge(index, detailed, long, stale_ids):
+    """`index` without the `stale_ids` injuries, plus those of them still in `detailed`.
+
+    The added vectors are scaled with the means and deviations of the
+    last full build, so every other vector stays as it is; a full
+    pipeline run rescales all of them. None when the index has no
+    scaling or an added injury has a position it has no column for.
+    """
+    fresh = detailed[detailed["injury_id"].isin(stale_ids)]
+    numbers, one_hot = features(fresh, long[long["injury_id"].isin(stale_ids)])
+    positions = list(index["features"][numbers.shape[1]:])
+    if "mean" not in index or not set(one_hot.columns) <= set(positions):
+        return None
+    added = rows(fresh, numbers, one_hot.reindex(columns=positions, fill_value=0), index["mean"], index["scale"])
+    keep = ~np.isin(index["injury_id"], np.asarray(stale_ids, dtype=str))
+    merged = {**index, **{key: np.concatenate([index[key][keep], value]) for key, value in added.items()}}
+    merged["player"] = players(merged["Name"])
+    return merged
+
+
+def save(index, path=INDEX_FILE):
+    # Same temporary-name dance as injury_counts.write
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **{key.replace(" ", "_"): value for key, value in index.items()})
+    os.replace(tmp, path)
+    return path
+
+
+def write(detailed, long, path=INDEX_FILE):
+    return save(build(detailed, long), path)
+
+
+def update(detailed, long, stale_ids, path=INDEX_FILE):
+    """Apply an incremental run to the index file; written from scratch when merge() cannot."""
+    index = merge(load(path), detailed, long, stale_ids) if os.path.exists(path) else None
+    return write(detailed, long, path) if index is None else save(index, path)
+
+
+def load(path=INDEX_FILE):
+    with np.load(path) as data:
+        return {key: data[key.replace(" ", "_")] for key in INDEX_KEYS if key.replace(" ", "_") in data.files}
+
+
+@instrument.profiled("similarity.nearest")
+def nearest(index, row, k=K, same_player=False):
+    """The `k` injuries closest to the one at `row`, nearest first, with their labels and distance.
+
+    Other injuries of the same player are left out unless `same_player`.
+    """
+    query = index["vectors"][row]
+    distances = index["norms"] - 2 * (index["vectors"] @ query) + index["norms"][row]
+    distances[row] = np.inf
+    if not same_player:
+        distances[index["player"] == index["player"][row]] = np.inf
+
+    k = min(k, int(np.isfinite(distances).sum()))
+    top = np.argpartition(distances, k)[:k] if k < len(distances) else np.arange(len(distances))
+    top = top[np.argsort(distances[top])][:k]
+    result = pd.DataFrame({col: index[col][top] for col in LABEL_COLS + DISPLAY_COLS})
+    result["Distance"] = np.sqrt(np.maximum(distances[top], 0))
+    return schema.apply(result)
+
+
+def injuries_of(index, name):
+    """Rows of the index holding `name`'s injuries."""
+    return np.flatnonzero(index["Name"] == name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Injuries whose recovery looked most like a player's.")
+    parser.add_argument("name", help="player name")
+    parser.add_argument("--index", default=INDEX_FILE)
+    parser.add_argument("-k", type=int, default=K, help="neighbours per injury (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    index = load(args.index)
+    rows = injuries_of(index, args.name)
+    if len(rows) == 0:
+        parser.exit(1, f"No injuries of '{args.name}' in {args.index}\n")
+    for row in rows:
+        print(f"\n{args.name}: {index['Injury'][row]} ({index['Date of Injury'][row]}, {index['Season'][row]})")
+        result = nearest(index, row, args.k)
+        print(result.drop(columns="injury_id").round(dict.fromkeys(DISPLAY_COLS + ["Distance"], 3)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+
+import instrument
+import schema
+
+# ---------------------------------------------------------
+# Table storage: Parquet / Feather with real dtypes, CSV as export
+# (dtypes are declared in schema.py)
+# ---------------------------------------------------------
+# Parquet and Feather need pyarrow (see requirements.txt).
+FORMATS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+# Readers try the columnar files first so an existing CSV keeps working
+# until the pipeline has been re-run with a columnar format.
+READ_ORDER = ["parquet", "feather", "csv"]
+
+
+def table_path(path, fmt="parquet"):
+    """Return `path` with the extension of `fmt` unless it already has a known one."""
+    if os.path.splitext(path)[1] in FORMATS.values():
+        return path
+    return path + FORMATS[fmt]
+
+
+def find_table(stem):
+    for fmt in READ_ORDER:
+        path = table_path(stem, fmt)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@instrument.profiled("storage.write_table")
+def write_table(df, path, fmt="parquet"):
+    path = table_path(path, fmt)
+    fmt = next(f for f, ext in FORMATS.items() if path.endswith(ext))
+    df = schema.apply(df)
+
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+@instrument.profiled("storage.read_table")
+def read_table(path, columns=None):
+    if path.endswith(FORMATS["parquet"]):
+        return pd.read_parquet(path, columns=columns)
+    if path.endswith(FORMATS["feather"]):
+        return pd.read_feather(path, columns=columns)
+
+    # CSV carries no types, so they are restored on load; categoricals
+    # are built while parsing rather than after
+    header = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, usecols=columns, dtype={"injury_id": str, **schema.read_dtypes(header)})
+    return schema.apply(df)
+
+
+def table_columns(path):
+    """Column names of a table file, without reading its data."""
+    if path.endswith(FORMATS["parquet"]):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    if path.endswith(FORMATS["feather"]):
+        import pyarrow as pa
+        return pa.ipc.open_file(path).schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def load_table(stem, columns=None):
+    """Load a pipeline table by name, e.g. load_table("cleaned_with_metrics")."""
+    path = find_table(stem)
+    if path is None:
+        raise FileNotFoundError(f"No table found for '{stem}' ({', '.join(FORMATS.values())})")
+    return read_table(path, columns)
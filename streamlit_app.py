@@ -1,156 +1,506 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+import analytics
+import api
+import injury_counts
+import injury_db
+import instrument
+import pipeline
+import significance
+import similarity
+import storage
+import views
 
 # -------------------------------------------------------
 # Load Data
 # -------------------------------------------------------
-df = pd.read_csv("cleaned_with_metrics.csv")
-df_summary = pd.read_csv("player_injury_phase_summary.csv")
+# Parquet from pipeline.py if present, otherwise the CSVs. Only the
+# columns the visuals need are read from the wide detailed table.
+#
+# Every loader and aggregate below is cached on (file path, mtime), and
+# the analytics cube on the fingerprint of its input tables, so a widget
+# change only re-runs the code that depends on that widget, and a
+# pipeline refresh (new mtime) invalidates the caches automatically.
+#
+# When the pipeline has written the SQLite store (injury_db.py), the
+# player timeline pushes its filters down to it: the filter options,
+# the matching names and one player's matches are indexed queries
+# instead of whole tables loaded into pandas.
+#
+# With the INJURY_API_URL environment variable set (see api.py), the
+# sections get their data from that service instead, which keeps one
+# copy of the tables for every viewer, and no table is read here.
+METRICS_COLS = ("Name", "Team Name", "Position", "Season")
+
+
+def table_key(stem, required=True):
+    path = storage.find_table(stem)
+    if path is None:
+        if required:
+            raise FileNotFoundError(f"No table found for '{stem}', run pipeline.py first")
+        return None, None
+    return path, os.path.getmtime(path)
+
+
+@st.cache_data(show_spinner=False)
+def load_table(path, mtime, columns=None):
+    return storage.read_table(path, list(columns) if columns else None)
+
+
+@st.cache_resource(show_spinner=False)
+@instrument.profiled("app.summary_by_player")
+def summary_by_player(path, mtime):
+    # Name-indexed, so looking up the selected player is a hash lookup.
+    # Shared by every session without copying, like similarity_index
+    return load_table(path, mtime).set_index("Name")
+
+
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.player_filters")
+def player_filters(path, mtime):
+    return views.player_filters(load_table(path, mtime, METRICS_COLS))
+
+
+@st.cache_resource(show_spinner=False)
+@instrument.profiled("app.player_match_ratings")
+def player_match_ratings(metrics_path, metrics_mtime, matches_path, matches_mtime):
+    # Per-match ratings from the long match table (or built from the wide
+    # table when the pipeline has not written one), grouped by player.
+    # Shared without copying: callers only look rows up
+    if matches_path:
+        detailed = load_table(metrics_path, metrics_mtime, ("injury_id", "Name", "Injury", "Date of Injury"))
+        long = load_table(matches_path, matches_mtime, ("injury_id", "phase", "match_index", "rating"))
+    else:
+        detailed = load_table(metrics_path, metrics_mtime)
+        long = pipeline.to_long(detailed)
+        detailed = detailed.assign(injury_id=pipeline.ids_of(detailed))
+
+    ratings = views.match_rating_rows(detailed, long)
+    return ratings, ratings.groupby("Name").indices
+
+
+@st.cache_data(show_spinner=False)
+def db_options(path, mtime, column):
+    return sorted(injury_db.select("injuries", [column], distinct=True, path=path)[column].dropna().astype(str))
+
+
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.db_player_names")
+def db_player_names(path, mtime, filters):
+    names = injury_db.select("injuries", ["Name"], dict(filters), distinct=True, path=path)
+    return names["Name"].astype(str).tolist()
+
+
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.db_player_match_ratings")
+def db_player_match_ratings(path, mtime, name):
+    detailed = injury_db.select("injuries", ["injury_id", "Name", "Injury", "Date of Injury"], {"Name": [name]},
+                                path=path)
+    long = injury_db.query(
+        "SELECT m.injury_id, m.phase, m.match_index, m.rating FROM matches m "
+        "JOIN injuries i ON i.injury_id = m.injury_id WHERE i.Name = ?", [name], path)
+    return views.match_rating_rows(detailed, long)
+
+
+@st.cache_resource(show_spinner=False)
+def similarity_index(path, mtime):
+    # Shared by every session without copying: the vectors are only read
+    return similarity.load(path)
+
+
+@st.cache_data(show_spinner=False)
+def similar_injuries(path, mtime, row, k):
+    return similarity.nearest(similarity_index(path, mtime), row, k)
+
+
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.count_cube")
+def count_cube(counts_path, counts_mtime, metrics_path, metrics_mtime):
+    # Injury counts by team x season x month x injury x position, built
+    # from the detailed table when the pipeline has not written them
+    if counts_path:
+        return injury_counts.load(counts_path)
+    columns = ("Team Name", "Season", "Date of Injury", "Injury", "Position")
+    return injury_counts.build(load_table(metrics_path, metrics_mtime, columns))
 
-st.title("⚽ Injury Impact Analytics Dashboard")
-st.write("Interactive analytics using player injury metrics and recovery data.")
 
-# -------------------------------------------------------
-# VISUAL 1 — Bar Chart: Top 10 Injuries With Highest Average Team Performance Drop
-# -------------------------------------------------------
+@st.cache_data(show_spinner=False)
+def analytics_cube(fingerprint):
+    # Aggregates shared with EDA.py, rebuilt only when the tables change
+    return analytics.load_cube()
+
+
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.group_significance")
+def group_significance(fingerprint):
+    # Bootstrap intervals and permutation p-values, cached on disk too
+    return significance.load_stats()
 
-st.header("1️⃣ Top 10 Injuries With Highest Average Team Performance Drop")
 
-# 1. Calculate Performance Drop for each incident: (GD Before) - (GD During Absence)
-# Positive value means the team performed WORSE without the player.
-# We use the correct column names from cleaned_with_metrics.csv.
-df["Injury_Performance_Drop"] = df["Avg_GD_Before_Injury"] - df["Avg_GD_Missed_Matches"]
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.age_vs_delta")
+def age_vs_delta(summary_path, summary_mtime, fingerprint):
+    return views.age_vs_delta(load_table(summary_path, summary_mtime), analytics_cube(fingerprint)["player_ages"])
 
-# 2. Aggregate the drop by the Injury type and calculate the average drop
-# This step calculates the average performance drop for each unique injury type, regardless of player or team.
-injury_drop_summary = df.groupby("Injury", dropna=True)["Injury_Performance_Drop"].mean().reset_index()
 
-# 3. Sort descending to get the 'Highest' average drops at the top and select Top 10
-top10_injury_types = injury_drop_summary.sort_values(
-    by="Injury_Performance_Drop",
-    ascending=False
-).head(10)
+@st.cache_data(show_spinner=False)
+@instrument.profiled("app.comeback_leaderboard")
+def comeback_leaderboard(path, mtime):
+    return views.comeback_leaderboard(load_table(path, mtime))
 
-# 4. Create the Bar Chart using the aggregated data
-fig1 = px.bar(
-    top10_injury_types,
-    x="Injury",  # Use injury type as the X-axis
-    y="Injury_Performance_Drop",
-    color="Injury_Performance_Drop", # Use color scale based on the drop value
-    title="Top 10 Injuries With Highest Average Team Performance Drop",
-    labels={"Injury_Performance_Drop": "Average Performance Drop (GD Decrease)", "Injury": "Injury Type"},
-)
 
-# Remove the legend as requested
-fig1.update_layout(showlegend=False)
+API_URL = os.environ.get(api.URL_ENV)
+similarity_key = ((similarity.INDEX_FILE, os.path.getmtime(similarity.INDEX_FILE))
+                  if os.path.exists(similarity.INDEX_FILE) else (None, None))
+if API_URL:
+    metrics_key = summary_key = db_key = counts_key = (None, None)
+    cube_key = None
+else:
+    metrics_key = table_key("cleaned_with_metrics")
+    summary_key = table_key("player_injury_phase_summary")
+    cube_key = analytics.fingerprint()
+    db_key = (injury_db.DB_FILE, os.path.getmtime(injury_db.DB_FILE)) if os.path.exists(injury_db.DB_FILE) else (None, None)
+    counts_key = (pipeline.COUNTS, os.path.getmtime(pipeline.COUNTS)) if os.path.exists(pipeline.COUNTS) else (None, None)
+
 
-st.plotly_chart(fig1, use_container_width=True)
 # -------------------------------------------------------
-# VISUAL 2 — Line Chart: Player Performance Timeline
+# Section data: from the service (api.py) or the local loaders
 # -------------------------------------------------------
+def from_api(endpoint, **params):
+    return api.fetch(API_URL, endpoint, **params)
 
-st.header("2️⃣ Player Performance Timeline (Before → After Injury)")
 
-player_selected = st.selectbox(
-    "Select a Player:",
-    df_summary["Name"].unique()
-)
+def adjusted_available():
+    if API_URL:
+        return from_api("options")["adjusted_available"]
+    return views.has_adjusted(analytics_cube(cube_key))
 
-ft = df_summary[df_summary["Name"] == player_selected].iloc[0]
 
-timeline_df = pd.DataFrame({
-    "Phase": ["Before Injury", "After Injury"],
-    "Average Rating": [
-        ft["Player_Avg_Rating_Before_Injury"],
-        ft["Player_Avg_Rating_After_Injury"]
-    ]
-})
+def top_injuries(measure, hide_noise):
+    if API_URL:
+        return pd.DataFrame(from_api("top-injuries", measure=measure, significant=int(hide_noise)))
+    stats = group_significance(cube_key) if hide_noise else None
+    return views.top_injury_drops(analytics_cube(cube_key), measure, stats)
 
-fig2 = px.line(
-    timeline_df,
-    x="Phase",
-    y="Average Rating",
-    markers=True,
-    title=f"Performance Timeline for {player_selected}"
-)
 
-st.plotly_chart(fig2, use_container_width=True)
+def player_options():
+    if API_URL:
+        return from_api("options")["players"]
+    if db_key[0]:
+        return {column: db_options(*db_key, column) for column in views.FILTER_COLS}
+    meta = player_filters(*metrics_key)
+    return {column: sorted(meta[column].unique()) for column in views.FILTER_COLS}
 
-# -------------------------------------------------------
-# VISUAL 3 — Heatmap: Injury Frequency Across Months and Clubs
-# -------------------------------------------------------
 
-st.header("3️⃣ Injury Frequency Heatmap (Month × Club)")
+def player_names(chosen):
+    if API_URL:
+        params = {name: chosen[column] for name, column in api.PLAYER_PARAMS.items()}
+        return from_api("players", **params)
+    summary = summary_by_player(*summary_key)
+    if db_key[0]:
+        filters = tuple((column, tuple(values)) for column, values in chosen.items() if values)
+        return summary.index.intersection(db_player_names(*db_key, filters))
+    return views.filtered_names(player_filters(*metrics_key), chosen, summary.index)
+
+
+def player_timeline(name):
+    """(average rating before, average rating after, per-match ratings) of a player."""
+    if API_URL:
+        timeline = from_api("player-timeline", name=name)
+        return (timeline["Player_Avg_Rating_Before_Injury"], timeline["Player_Avg_Rating_After_Injury"],
+                pd.DataFrame(timeline["matches"], columns=["Name", "Injury Event", "Match", "rating"]))
+    ft = summary_by_player(*summary_key).loc[name]
+    if db_key[0]:
+        matches = db_player_match_ratings(*db_key, name)
+    else:
+        ratings, by_player = player_match_ratings(*metrics_key, *table_key("injury_matches", required=False))
+        matches = ratings.iloc[by_player.get(name, [])]
+    return ft["Player_Avg_Rating_Before_Injury"], ft["Player_Avg_Rating_After_Injury"], matches
+
+
+def heatmap_options():
+    if API_URL:
+        return from_api("options")["heatmap"]
+    cube = count_cube(*counts_key, *metrics_key)
+    return {column: list(cube[column]) for column in ["Injury", "Season", "Position"]}
+
+
+def month_club_heatmap(filters):
+    if API_URL:
+        params = {name: filters[column] for name, column in api.HEATMAP_PARAMS.items()}
+        heatmap = from_api("heatmap", **params)
+        pivot = pd.DataFrame(heatmap["counts"], index=pd.Index(heatmap["teams"], name="Team Name"),
+                             columns=pd.Index(heatmap["months"], name="Injury_Month"))
+        return pivot, heatmap["undated"]
+    return views.month_club_heatmap(count_cube(*counts_key, *metrics_key), filters)
+
+
+def age_scatter():
+    if API_URL:
+        return pd.DataFrame(from_api("age-vs-delta"))
+    return age_vs_delta(*summary_key, cube_key)
+
 
-df["Date of Injury"] = pd.to_datetime(df["Date of Injury"], errors="coerce")
-df["Injury_Month"] = df["Date of Injury"].dt.month
-df["Injury_Month"] = df["Injury_Month"].fillna(0).astype(int)
+def leaderboard():
+    if API_URL:
+        return pd.DataFrame(from_api("leaderboard"), columns=views.LEADERBOARD_COLS)
+    return comeback_leaderboard(*summary_key)
 
-pivot = df.pivot_table(
-    index="Team Name",
-    columns="Injury_Month",
-    values="Name",
-    aggfunc="count"
-).fillna(0)
 
-fig3, ax = plt.subplots(figsize=(12, 6))
-sns.heatmap(pivot, cmap="Reds", annot=True, fmt="g", ax=ax)
-st.pyplot(fig3)
+def recovery_duration():
+    if API_URL:
+        return pd.DataFrame(from_api("recovery"))
+    return views.recovery_duration(analytics_cube(cube_key))
+
+
+st.title("⚽ Injury Impact Analytics Dashboard")
+st.write("Interactive analytics using player injury metrics and recovery data.")
+
 
 # -------------------------------------------------------
-# VISUAL 4 — Scatter Plot: Player Age vs Player Performance Drop
+# VISUAL 1 — Bar Chart: Top 10 Injuries With Highest Average Team Performance Drop
 # -------------------------------------------------------
+def show_top_injuries():
+    st.header("1️⃣ Top 10 Injuries With Highest Average Team Performance Drop")
+
+    has_adjusted = adjusted_available()
+    adjusted = st.checkbox(
+        "Adjust for opposition strength",
+        disabled=not has_adjusted,
+        help="GDs relative to what teams usually get against the same opponent"
+             + ("" if has_adjusted else " (re-run pipeline.py to compute them)"),
+    )
+    hide_noise = st.checkbox(
+        "Hide injury types whose drop could be noise",
+        help=f"Keep injury types whose average drop differs from the overall average in a permutation test "
+             f"(p < {significance.ALPHA}), with {significance.CONFIDENCE:.0%} bootstrap intervals",
+    )
+    measure = "Adj_Team_Performance_Drop_Index" if adjusted else "Team_Performance_Drop_Index"
+    top10_injury_types = top_injuries(measure, hide_noise)
+    if top10_injury_types.empty:
+        st.info("No injury type has a drop that stands out from the noise.")
+        return
+
+    # 4. Create the Bar Chart using the aggregated data
+    error_bars = {}
+    if hide_noise:
+        error_bars = {
+            "error_y": top10_injury_types["CI_High"] - top10_injury_types["Injury_Performance_Drop"],
+            "error_y_minus": top10_injury_types["Injury_Performance_Drop"] - top10_injury_types["CI_Low"],
+        }
+    fig1 = px.bar(
+        top10_injury_types,
+        x="Injury",  # Use injury type as the X-axis
+        y="Injury_Performance_Drop",
+        color="Injury_Performance_Drop", # Use color scale based on the drop value
+        title="Top 10 Injuries With Highest Average Team Performance Drop",
+        labels={"Injury_Performance_Drop": "Average Performance Drop (GD Decrease)", "Injury": "Injury Type"},
+        **error_bars,
+    )
+
+    # Remove the legend as requested
+    fig1.update_layout(showlegend=False)
+
+    st.plotly_chart(fig1, use_container_width=True)
 
-st.header("4️⃣ Player Age vs Player Performance Drop Index")
 
-# Clean data for plotting
-df_scatter = df_summary.copy()
+# -------------------------------------------------------
+# VISUAL 2 — Line Chart: Player Performance Timeline
+# -------------------------------------------------------
+def show_player_timeline():
+    st.header("2️⃣ Player Performance Timeline (Before → After Injury)")
+
+    # Narrow the player list by team, position and season; the
+    # selectbox itself can be typed into to search the remaining names.
+    options = player_options()
+    col_team, col_pos, col_season = st.columns(3)
+    teams = col_team.multiselect("Team", options["Team Name"])
+    positions = col_pos.multiselect("Position", options["Position"])
+    seasons = col_season.multiselect("Season", options["Season"])
+    names = player_names({"Team Name": teams, "Position": positions, "Season": seasons})
+
+    player_selected = st.selectbox(
+        "Select a Player:",
+        names
+    )
+    if player_selected is None:
+        st.info("No player matches these filters.")
+        return
+
+    rating_before, rating_after, player_ratings = player_timeline(player_selected)
+
+    timeline_df = pd.DataFrame({
+        "Phase": ["Before Injury", "After Injury"],
+        "Average Rating": [
+            rating_before,
+            rating_after
+        ]
+    })
+
+    fig2 = px.line(
+        timeline_df,
+        x="Phase",
+        y="Average Rating",
+        markers=True,
+        title=f"Performance Timeline for {player_selected}"
+    )
+
+    st.plotly_chart(fig2, use_container_width=True)
+
+    # Match-by-match ratings around each of the player's injuries
+    if not player_ratings.empty:
+        fig_matches = px.line(
+            player_ratings,
+            x="Match",
+            y="rating",
+            color="Injury Event",
+            markers=True,
+            title=f"Per-match Ratings for {player_selected}",
+            labels={"rating": "Player Rating"},
+        )
+        st.plotly_chart(fig_matches, use_container_width=True)
+
+    # Historical injuries (of other players) whose before / missed /
+    # after matches and player profile were closest to this one
+    st.subheader("Injuries That Recovered Most Like This One")
+    if not similarity_key[0]:
+        st.info("Run pipeline.py to build the recovery similarity index.")
+        return
+    index = similarity_index(*similarity_key)
+    rows = similarity.injuries_of(index, player_selected)
+    if len(rows) == 0:
+        st.info("This player's injuries are not in the similarity index yet.")
+        return
+    col_injury, col_k = st.columns([3, 1])
+    row = col_injury.selectbox(
+        "Injury",
+        rows,
+        format_func=lambda r: f"{index['Injury'][r]} ({index['Date of Injury'][r]})",
+    )
+    k = col_k.number_input("Similar cases", min_value=1, max_value=50, value=similarity.K)
+    st.dataframe(
+        similar_injuries(*similarity_key, int(row), int(k)).drop(columns="injury_id"),
+        hide_index=True,
+        use_container_width=True,
+    )
 
-# FIX: The 'Age' column is in the 'df' (cleaned_with_metrics.csv) file, not 'df_summary'.
-# We extract unique Name and Age pairs from 'df' and merge them into 'df_scatter'.
-age_data = df[["Name", "Age"]].drop_duplicates()
-df_scatter = df_scatter.merge(age_data, on="Name", how="left")
 
-# The 'Age' column is now available via the merge.
-df_scatter["Age"] = pd.to_numeric(df_scatter["Age"], errors="coerce")
+# -------------------------------------------------------
+# VISUAL 3 — Heatmap: Injury Frequency Across Months and Clubs
+# -------------------------------------------------------
+def show_month_club_heatmap():
+    st.header("3️⃣ Injury Frequency Heatmap (Month × Club)")
+
+    options = heatmap_options()
+
+    # Filters slice the precomputed count cube; nothing is re-read
+    col_injury, col_season, col_pos = st.columns(3)
+    filters = {
+        "Injury": col_injury.multiselect("Injury type", options["Injury"]),
+        "Season": col_season.multiselect("Season", options["Season"], key="heatmap_season"),
+        "Position": col_pos.multiselect("Position", options["Position"], key="heatmap_position"),
+    }
+    pivot, undated = month_club_heatmap(filters)
+
+    if pivot.empty:
+        st.info("No injuries match these filters.")
+    else:
+        # Plotly heatmap from the cube slice; no matplotlib/seaborn needed
+        fig3 = px.imshow(
+            pivot,
+            color_continuous_scale="Reds",
+            text_auto=True,
+            aspect="auto",
+            labels={"x": "Injury Month", "y": "Team Name", "color": "Injuries"},
+        )
+        st.plotly_chart(fig3, use_container_width=True)
+    if undated:
+        st.caption(f"{undated} matching injuries have no parseable injury date and are not shown.")
 
 
-# --- NEW LOGIC: Use Player_Rating_Delta for Y-axis and Size ---
-# The metric for player performance drop is 'Player_Rating_Delta' (After - Before).
-# Negative Delta means a drop in player rating.
-df_scatter["Size_Positive"] = df_scatter["Player_Rating_Delta"].abs()
+# -------------------------------------------------------
+# VISUAL 4 — Scatter Plot: Player Age vs Player Performance Drop
+# -------------------------------------------------------
+def show_age_scatter():
+    st.header("4️⃣ Player Age vs Player Performance Drop Index")
 
-# Replace NaN values with 0 to avoid Plotly errors
-df_scatter["Size_Positive"] = df_scatter["Size_Positive"].fillna(0)
+    # Clean data for plotting
+    df_scatter = age_scatter()
 
-# Drop NaN Age and Player_Rating_Delta values for plotting
-df_scatter = df_scatter.dropna(subset=["Age", "Player_Rating_Delta"]) 
+    fig4 = px.scatter(
+        df_scatter,
+        x="Age",
+        y="Player_Rating_Delta", # Changed from Team_Performance_Drop
+        color="Player_Rating_Delta", # Changed from Team_Performance_Drop
+        size="Size_Positive",       # Changed to Player_Rating_Delta.abs()
+        hover_name="Name",
+        title="Age vs Player Rating Delta (Bubble size = magnitude of change)",
+        labels={"Player_Rating_Delta": "Player Rating Delta (After - Before)"} # Updated Label
+    )
+    st.plotly_chart(fig4, use_container_width=True)
 
-fig4 = px.scatter(
-    df_scatter,
-    x="Age",
-    y="Player_Rating_Delta", # Changed from Team_Performance_Drop
-    color="Player_Rating_Delta", # Changed from Team_Performance_Drop
-    size="Size_Positive",       # Changed to Player_Rating_Delta.abs()
-    hover_name="Name",
-    title="Age vs Player Rating Delta (Bubble size = magnitude of change)",
-    labels={"Player_Rating_Delta": "Player Rating Delta (After - Before)"} # Updated Label
-)
-st.plotly_chart(fig4, use_container_width=True)
 
 # -------------------------------------------------------
 # VISUAL 5 — Leaderboard: Comeback Rating Improvement
 # -------------------------------------------------------
+def show_leaderboard():
+    st.header("5️⃣ Comeback Leaderboard (Rating Improvement After Injury)")
 
-st.header("5️⃣ Comeback Leaderboard (Rating Improvement After Injury)")
+    st.dataframe(leaderboard(), use_container_width=True)
 
-leaderboard = df_summary.sort_values(
-    by="Player_Rating_Delta", ascending=False
-)[["Name", "Player_Rating_Delta",
-   "Player_Avg_Rating_Before_Injury",
-   "Player_Avg_Rating_After_Injury"]]
 
-st.dataframe(leaderboard, use_container_width=True)
+# -------------------------------------------------------
+# VISUAL 6 — Bar Charts: Recovery Duration
+# -------------------------------------------------------
+def show_recovery_duration():
+    st.header("6️⃣ Performance by Recovery Duration")
+
+    recovery = recovery_duration()
+    if recovery.empty:
+        st.info("No injuries have both an injury and a return date.")
+        return
+
+    col_drop, col_delta = st.columns(2)
+    col_drop.plotly_chart(px.bar(
+        recovery, x="Recovery", y="Avg_Performance_Drop", hover_data=["Injuries", "Avg_Days_Out"],
+        title="Team Performance Drop by Time Out",
+        labels={"Avg_Performance_Drop": "Average Performance Drop (GD Decrease)", "Recovery": "Time Out"},
+    ), use_container_width=True)
+    col_delta.plotly_chart(px.bar(
+        recovery, x="Recovery", y="Avg_Rating_Delta", hover_data=["Injuries", "Avg_Days_Out"],
+        title="Player Rating Delta by Time Out",
+        labels={"Avg_Rating_Delta": "Player Rating Delta (After - Before)", "Recovery": "Time Out"},
+    ), use_container_width=True)
+
+
+# -------------------------------------------------------
+# Only the selected section is computed and rendered
+# -------------------------------------------------------
+SECTIONS = {
+    "1️⃣ Top Injuries": show_top_injuries,
+    "2️⃣ Player Timeline": show_player_timeline,
+    "3️⃣ Month × Club Heatmap": show_month_club_heatmap,
+    "4️⃣ Age vs Rating Delta": show_age_scatter,
+    "5️⃣ Comeback Leaderboard": show_leaderboard,
+    "6️⃣ Recovery Duration": show_recovery_duration,
+}
+
+section = st.radio("Section", list(SECTIONS), horizontal=True, label_visibility="collapsed")
+
+# Debug panel: timings of this rerun (cached aggregates only show up
+# when they were actually recomputed, e.g. after a pipeline refresh)
+if st.sidebar.checkbox("Show stage timings", value=instrument.enabled()):
+    with instrument.collect() as records:
+        with instrument.stage(f"app.section {section}"):
+            SECTIONS[section]()
+    st.sidebar.subheader("Stage timings")
+    st.sidebar.dataframe(
+        pd.DataFrame(records, columns=["stage", "seconds", "peak_mb", "rows_in", "rows_out"]),
+        hide_index=True,
+    )
+else:
+    SECTIONS[section]()
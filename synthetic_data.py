@@ -0,0 +1,99 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+import schema
+
+# ---------------------------------------------------------
+# Synthetic injury records in the raw file's wide schema
+# ---------------------------------------------------------
+# Teams, positions, injuries, seasons, opponents and the per-slot
+# N.A. rates are taken from the shipped player_injuries_impact.csv,
+# so the generated file looks like a bigger version of the real one.
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def generate(rows, template_path=pipeline.RAW_CSV, seed=0, missing_result_rate=0.01):
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(template_path, dtype=str, keep_default_na=False)
+
+    def pick(values, size=rows):
+        values = np.asarray(values, dtype=object)
+        return values[rng.integers(0, len(values), size)]
+
+    # About three injuries per player, like the shipped data
+    first = template["Name"].str.split().str[0].unique()
+    last = template["Name"].str.split().str[-1].unique()
+    players = np.char.add(np.char.add(pick(first, max(rows // 3, 1)).astype(str), " "),
+                          pick(last, max(rows // 3, 1)).astype(str))
+    player_ids = rng.integers(0, len(players), rows)
+
+    df = pd.DataFrame({
+        "Name": players[player_ids],
+        "Team Name": pick(template["Team Name"].unique()),
+        "Position": pick(template["Position"].unique()),
+        "Age": rng.integers(18, 38, rows),
+        "Season": pick(template["Season"].unique()),
+        "FIFA rating": rng.integers(66, 91, rows),
+        "Injury": pick(template["Injury"].unique()),
+    })
+
+    # Dates inside the season's first year (Aug-Dec) or second year (Jan-May)
+    start_year = df["Season"].str[:4].astype(int).to_numpy()
+    month = rng.choice([8, 9, 10, 11, 12, 1, 2, 3, 4, 5], rows)
+    year = np.where(month >= 8, start_year, start_year + 1)
+    injured = pd.to_datetime(pd.DataFrame({"year": year, "month": month, "day": rng.integers(1, 29, rows)}))
+    returned = injured + pd.to_timedelta(rng.gamma(1.5, 25, rows).astype(int) + 3, unit="D")
+    for col, dates in [("Date of Injury", injured), ("Date of return", returned)]:
+        df[col] = (pd.Series(MONTHS, dtype=object).to_numpy()[dates.dt.month - 1]
+                   + " " + dates.dt.day.astype(str) + ", " + dates.dt.year.astype(str))
+
+    # Match slots: results follow the GD sign, some slots are N.A.
+    # and a few results are "Missing", as in the feeds
+    opponents = pd.unique(template[[c for c in template.columns if c.endswith("_Opposition")]].to_numpy().ravel())
+    opponents = [o for o in opponents if o not in pipeline.NA_TOKENS]
+    for cols in schema.match_slots(template).values():
+        by_field = {field: col for col, field in cols.items()}
+        missing_rate = (template[by_field["result"]].isin(pipeline.NA_TOKENS)).mean()
+        missing = rng.random(rows) < missing_rate
+
+        gd = np.clip(np.rint(rng.normal(0, 2, rows)), -9, 9).astype(int)
+        result = np.where(gd > 0, "win", np.where(gd < 0, "lose", "draw")).astype(object)
+        result[rng.random(rows) < missing_result_rate] = "Missing"
+
+        slot = {
+            "result": result,
+            "opposition": pick(opponents),
+            "GD": gd.astype(str).astype(object),
+        }
+        if "rating" in by_field:
+            rating = np.clip(rng.normal(6.4, 0.8, rows), 3, 10).round(1).astype(str).astype(object)
+            subbed = rng.random(rows) < 0.16
+            rating[subbed] = rating[subbed] + "(S)"
+            slot["rating"] = rating
+
+        for field, values in slot.items():
+            values[missing] = "N.A."
+            df[by_field[field]] = values
+
+    return df[template.columns]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic injury records in the raw CSV schema.")
+    parser.add_argument("--scale", type=float, default=10, help="size as a multiple of the shipped dataset")
+    parser.add_argument("--rows", type=int, default=None, help="exact number of rows (overrides --scale)")
+    parser.add_argument("--template", default=pipeline.RAW_CSV, help="raw CSV used for categories and gap rates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="synthetic_player_injuries_impact.csv")
+    args = parser.parse_args(argv)
+
+    rows = args.rows or int(round(args.scale * (sum(1 for _ in open(args.template)) - 1)))
+    generate(rows, args.template, args.seed).to_csv(args.output, index=False)
+    print(f"Wrote {rows} synthetic injuries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
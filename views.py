@@ -0,0 +1,124 @@
+import pandas as pd
+
+import analytics
+import injury_counts
+import schema
+import significance
+
+# ---------------------------------------------------------
+# Data behind the dashboard sections
+# ---------------------------------------------------------
+# Plain DataFrames in and out, without Streamlit: streamlit_app.py
+# calls these on the local tables (with its caches around them) and
+# api.py serves the same results as JSON, so both show the same numbers.
+TOP_N = 10
+FILTER_COLS = ["Team Name", "Position", "Season"]
+LEADERBOARD_COLS = ["Name", "Player_Rating_Delta", "Player_Avg_Rating_Before_Injury", "Player_Avg_Rating_After_Injury"]
+
+
+def has_adjusted(cube):
+    return bool(cube["injuries"][("Adj_Team_Performance_Drop_Index", "count")].sum() > 0)
+
+
+def top_injury_drops(cube, measure="Team_Performance_Drop_Index", stats=None, limit=TOP_N):
+    # Average performance drop, (GD Before) - (GD During Absence), per
+    # injury type; positive means the team performed WORSE without the player.
+    # The Adj_ measure uses GDs relative to the opponents' strength.
+    injury_drop_summary = (
+        cube["injuries"][(measure, "mean")]
+        .rename("Injury_Performance_Drop").reset_index()
+    )
+    # With `stats`, only injury types whose drop is unlikely to be noise
+    # are kept, with their confidence intervals
+    if stats is not None:
+        table = stats["Injury"][measure]
+        kept = significance.significant(stats["Injury"], measure)
+        injury_drop_summary = injury_drop_summary[injury_drop_summary["Injury"].isin(kept)]
+        injury_drop_summary = injury_drop_summary.assign(
+            CI_Low=injury_drop_summary["Injury"].map(table["ci_low"]),
+            CI_High=injury_drop_summary["Injury"].map(table["ci_high"]),
+        )
+
+    # Sort descending to get the 'Highest' average drops at the top and select Top 10
+    return injury_drop_summary.sort_values(
+        by="Injury_Performance_Drop",
+        ascending=False
+    ).head(limit)
+
+
+def player_filters(detailed):
+    meta = detailed[["Name"] + FILTER_COLS].astype(str)
+    meta["Position"] = meta["Position"].str.strip()
+    return meta.drop_duplicates()
+
+
+def filtered_names(meta, chosen, names):
+    """Those of `names` with an injury matching every non-empty {column: values} of `chosen`."""
+    mask = pd.Series(True, index=meta.index)
+    for column, values in chosen.items():
+        if values:
+            mask &= meta[column].isin(values)
+    return names.intersection(meta.loc[mask, "Name"].unique())
+
+
+def match_rating_rows(detailed, long):
+    # Before/after ratings of the injuries in `detailed`, labelled and in match order
+    # Already datetime64 from the pipeline tables (parsed once per distinct value otherwise)
+    dates = schema.parse_dates(detailed["Date of Injury"])
+    injuries = pd.DataFrame({
+        "injury_id": detailed["injury_id"],
+        "Name": detailed["Name"],
+        "Injury Event": detailed["Injury"].astype(str) + " (" + dates.dt.strftime("%b %d, %Y").fillna("?") + ")",
+    })
+
+    ratings = long[long["phase"].astype(str).isin(["before_injury", "after_injury"]) & long["rating"].notna()]
+    ratings = ratings.merge(injuries, on="injury_id")
+    ratings["Match"] = (
+        ratings["phase"].astype(str).map({"before_injury": "Before", "after_injury": "After"})
+        + " M" + ratings["match_index"].astype(str)
+    )
+    ratings["order"] = (ratings["phase"].astype(str) == "after_injury") * 1000 + ratings["match_index"]
+    ratings = ratings.sort_values(["Name", "order"]).reset_index(drop=True)
+    return ratings[["Name", "Injury Event", "Match", "rating"]]
+
+
+def month_club_heatmap(counts, filters):
+    """Team x month injury counts for `filters`, and how many matching injuries have no month."""
+    pivot = injury_counts.select(counts, "Team Name", "Injury_Month", filters)
+    undated = int(pivot[injury_counts.UNKNOWN_MONTH].sum())
+    pivot = pivot.drop(columns=injury_counts.UNKNOWN_MONTH)
+    return pivot.loc[pivot.sum(axis=1) > 0, pivot.sum(axis=0) > 0], undated
+
+
+def age_vs_delta(summary, player_ages):
+    # 'Age' is in the detailed table, not the summary: unique Name and
+    # Age pairs come from the cube and are merged into 'df_scatter'.
+    df_scatter = summary.merge(player_ages, on="Name", how="left")
+    df_scatter["Age"] = pd.to_numeric(df_scatter["Age"], errors="coerce")
+
+    # --- NEW LOGIC: Use Player_Rating_Delta for Y-axis and Size ---
+    # The metric for player performance drop is 'Player_Rating_Delta' (After - Before).
+    # Negative Delta means a drop in player rating.
+    df_scatter["Size_Positive"] = df_scatter["Player_Rating_Delta"].abs()
+
+    # Replace NaN values with 0 to avoid Plotly errors
+    df_scatter["Size_Positive"] = df_scatter["Size_Positive"].fillna(0)
+
+    # Drop NaN Age and Player_Rating_Delta values for plotting
+    return df_scatter.dropna(subset=["Age", "Player_Rating_Delta"])
+
+
+def comeback_leaderboard(summary):
+    return summary.sort_values(by="Player_Rating_Delta", ascending=False)[LEADERBOARD_COLS]
+
+
+def recovery_duration(cube):
+    # Days out come from the dates parsed by the pipeline; the buckets
+    # are rolled up in the analytics cube
+    return analytics.select(
+        cube["recovery"],
+        Injuries=("rows", ""),
+        Avg_Days_Out=("Days_Out", "mean"),
+        Avg_Performance_Drop=("Team_Performance_Drop_Index", "mean"),
+        Avg_Rating_Delta=("Player_Rating_Delta", "mean"),
+    ).reset_index()